@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Run collectstatic against a local S3-compatible server and report what it uploads.
+
+A copy of static/ plus the admin files is collected into a fresh bucket
+with main.storage.IncrementalManifestStaticStorage, several times:
+
+    cold       empty bucket, everything is uploaded
+    unchanged  nothing changed, nothing should be uploaded
+    edited     one line appended to css/styles.css
+    no-cache   unchanged, but the local inventory file was deleted
+
+and, with --compare, the same runs with storages' stock
+S3ManifestStaticStorage (which re-uploads everything every time). By default
+an in-process moto server stands in for R2; pass --endpoint to use another
+one, e.g. MinIO.
+
+Usage:
+    python backend/scripts/bench_collectstatic.py [--workers 8] [--compare]
+    docker run --rm -p 9000:9000 minio/minio server /data
+    python backend/scripts/bench_collectstatic.py --endpoint http://localhost:9000 \
+        --access-key minioadmin --secret-key minioadmin
+"""
+
+import argparse
+import io
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import boto3
+import django
+from django.conf import settings
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+# storage -> (class, options). The stock storage needs file_overwrite off:
+# with it on, exists() is always False and post-processing fails.
+STORAGES = {
+    "incremental": ("main.storage.IncrementalManifestStaticStorage", {}),
+    "stock": (
+        "storages.backends.s3.S3ManifestStaticStorage",
+        {"file_overwrite": False},
+    ),
+}
+
+
+def start_moto():
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"  # noqa: E231
+
+
+def configure(args, workdir):
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.admin",
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.staticfiles",
+        ],
+        STATIC_URL="/static/",
+        STATICFILES_DIRS=[workdir / "static"],
+        STATIC_UPLOAD_WORKERS=args.workers,
+        STATIC_INVENTORY_FILE=str(workdir / "inventory.json"),
+        AWS_S3_ACCESS_KEY_ID=args.access_key,
+        AWS_SECRET_ACCESS_KEY=args.secret_key,
+        AWS_S3_ENDPOINT_URL=args.endpoint,
+        AWS_S3_REGION_NAME="us-east-1",
+        AWS_QUERYSTRING_AUTH=False,
+        AWS_S3_FILE_OVERWRITE=True,
+        AWS_IS_GZIPPED=True,
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+def collect(kind, bucket):
+    from django.contrib.staticfiles.management.commands import collectstatic
+    from django.utils.module_loading import import_string
+
+    storage_path, options = STORAGES[kind]
+    storage = import_string(storage_path)(bucket_name=bucket, **options)
+    command = collectstatic.Command(stdout=io.StringIO())
+    command.storage = storage
+    started = time.perf_counter()
+    command.handle(
+        interactive=False,
+        verbosity=0,
+        link=False,
+        clear=False,
+        dry_run=False,
+        ignore_patterns=[],
+        use_default_ignore_patterns=True,
+        post_process=True,
+    )
+    elapsed = time.perf_counter() - started
+    stats = getattr(storage, "stats", None)
+    if stats is None:
+        # The stock storage uploads every file it is handed.
+        stats = {"uploaded": len(command.copied_files) + len(command.unmodified_files)}
+    return stats, elapsed
+
+
+def run(kind, args, s3, workdir):
+    bucket = f"bench-{kind}"
+    s3.create_bucket(Bucket=bucket)
+    inventory = workdir / "inventory.json"
+    inventory.unlink(missing_ok=True)
+    styles = workdir / "static" / "css" / "styles.css"
+    original = styles.read_bytes()
+
+    steps = [
+        ("cold", lambda: None),
+        ("unchanged", lambda: None),
+        ("edited", lambda: styles.write_bytes(original + b"\n/* edited */\n")),
+        ("no-cache", lambda: inventory.unlink(missing_ok=True)),
+    ]
+    for step, prepare in steps:
+        prepare()
+        stats, elapsed = collect(kind, bucket)
+        uploaded = stats.get("bytes", 0) / 1e6
+        print(
+            f"{kind:<12} {step:<10} {stats['uploaded']:>8} {stats.get('skipped', '-'):>8}"
+            f" {stats.get('deleted', '-'):>8} {elapsed:>8.2f}"
+            f" {uploaded / elapsed if uploaded else 0:>8.2f}"
+        )
+    styles.write_bytes(original)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoint", help="S3 endpoint URL (default: moto)")
+    parser.add_argument("--access-key", default="testing")
+    parser.add_argument("--secret-key", default="testing")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--compare", action="store_true")
+    args = parser.parse_args()
+
+    server = None
+    if args.endpoint is None:
+        server, args.endpoint = start_moto()
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        shutil.copytree(project_root / "static", workdir / "static")
+        configure(args, workdir)
+        s3 = boto3.client(
+            "s3",
+            endpoint_url=args.endpoint,
+            aws_access_key_id=args.access_key,
+            aws_secret_access_key=args.secret_key,
+            region_name="us-east-1",
+        )
+        print(
+            f"{'storage':<12} {'run':<10} {'uploaded':>8} {'skipped':>8}"
+            f" {'deleted':>8} {'seconds':>8} {'MB/s':>8}"
+        )
+        for kind in ["incremental", "stock"] if args.compare else ["incremental"]:
+            run(kind, args, s3, workdir)
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare per-request database latency with and without persistent connections.
+
+Runs simulated requests against a local (or any reachable) PostgreSQL
+through Django's connection handling: each "request" sends request_started,
+runs the queries a logged-in page view makes (session and user lookups,
+approximated with two small SELECTs), and sends request_finished. Modes:
+
+    per-request  CONN_MAX_AGE=0, a new connection every request (the old setup)
+    persistent   CONN_MAX_AGE=600 with CONN_HEALTH_CHECKS, as in production.py
+    no-checks    CONN_MAX_AGE=600 without health checks, to isolate their cost
+
+Connection settings come from the usual libpq variables (PGHOST, PGPORT,
+PGUSER, PGPASSWORD, PGDATABASE). Set --sslmode require to include the TLS
+handshake, which is what dominates against RDS.
+
+Usage:
+    docker run --rm -e POSTGRES_PASSWORD=bench -p 5432:5432 postgres:16
+    PGHOST=localhost PGUSER=postgres PGPASSWORD=bench \
+        python backend/scripts/bench_db_connections.py [--requests 500] \
+        [--sslmode disable]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import django
+from django.conf import settings
+
+# mode -> (database alias, connection settings)
+MODES = {
+    "per-request": ("default", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+    "persistent": ("persistent", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}),
+    "no-checks": ("no_checks", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": False}),
+}
+
+
+def configure(sslmode):
+    settings.configure(
+        DATABASES={
+            alias: {
+                "ENGINE": "django.db.backends.postgresql",
+                "NAME": os.environ.get("PGDATABASE", "postgres"),
+                "USER": os.environ.get("PGUSER", "postgres"),
+                "PASSWORD": os.environ.get("PGPASSWORD", ""),
+                "HOST": os.environ.get("PGHOST", "localhost"),
+                "PORT": os.environ.get("PGPORT", "5432"),
+                "OPTIONS": {"sslmode": sslmode, "connect_timeout": 5},
+                **options,
+            }
+            for alias, options in MODES.values()
+        },
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+def simulated_request(alias):
+    from django.core.signals import request_finished, request_started
+    from django.db import connections
+
+    started = time.perf_counter()
+    request_started.send(sender=None)
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT %s::text, now()", ["session"])
+        cursor.fetchone()
+        cursor.execute("SELECT %s::int, current_user", [1])
+        cursor.fetchone()
+    request_finished.send(sender=None)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sslmode", default="prefer")
+    args = parser.parse_args()
+
+    configure(args.sslmode)
+    print(f"{'mode':<12} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode, (alias, _) in MODES.items():
+        simulated_request(alias)  # DNS, auth caches, first connection
+        timings = sorted(simulated_request(alias) for _ in range(args.requests))
+        p = [timings[int(len(timings) * q)] * 1000 for q in (0.50, 0.95, 0.99)]
+        mean = statistics.mean(timings) * 1000
+        print(f"{mode:<12} {mean:>8.2f} {p[0]:>8.2f} {p[1]:>8.2f} {p[2]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
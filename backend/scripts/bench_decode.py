@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Measure the decode stage of optimize_images.py on large inputs.
+
+    old  Image.open + verify() as is_image_file() did, then open again,
+         convert RGBA to RGB and thumbnail() to 1200px
+    new  open_image(): one open with JPEG draft() to the smallest DCT scale
+         that still covers 1200px, thumbnail(), then convert
+
+Camera-sized inputs are made from a tree photo: 4032x3024 and 6000x4000
+JPEGs and a 4000x3000 RGBA PNG. Each (pipeline, image) runs in its own
+child process. "+peak MB" is how far its RSS high-water mark rises while
+decoding; time is the best of --repeat.
+
+Usage:
+    python backend/scripts/bench_decode.py [--repeat 3] [photo.jpg]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from optimize_images import MAX_SIZE, STATIC_DIR, open_image
+from PIL import Image
+
+INPUTS = [
+    ("4032x3024.jpg", (4032, 3024), "JPEG"),
+    ("6000x4000.jpg", (6000, 4000), "JPEG"),
+    ("4000x3000.png", (4000, 3000), "PNG"),
+]
+
+
+def old_decode(path):
+    with Image.open(path) as img:
+        img.verify()
+    with Image.open(path) as img:
+        if img.mode == "RGBA":
+            img = img.convert("RGB")
+        if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
+            img.thumbnail(MAX_SIZE)
+        img.load()
+        return img.size
+
+
+def new_decode(path):
+    with open_image(path) as img:
+        if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
+            img.thumbnail(MAX_SIZE)
+        if img.mode == "RGBA":
+            img = img.convert("RGB")
+        img.load()
+        return img.size
+
+
+PIPELINES = {"old": old_decode, "new": new_decode}
+
+
+def make_inputs(photo, directory):
+    with Image.open(photo) as img:
+        img = img.convert("RGB")
+        for name, size, format in INPUTS:
+            resized = img.resize(size, Image.BICUBIC)
+            if format == "PNG":
+                resized.putalpha(255)
+                resized.save(directory / name, format, compress_level=1)
+            else:
+                resized.save(directory / name, format, quality=92)
+
+
+def peak_rss_mb():
+    """This process's RSS high-water mark (Linux).
+
+    Not ru_maxrss: that carries over exec() from the forked parent.
+    """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_one(pipeline, path, repeat):
+    decode = PIPELINES[pipeline]
+    baseline = peak_rss_mb()
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = decode(path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    peak = peak_rss_mb() - baseline
+    print(json.dumps({"seconds": best, "peak_mb": peak, "size": size}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "photo", nargs="?", type=Path, default=STATIC_DIR / "images/trees/fig.jpg"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run[0], Path(args.run[1]), args.repeat)
+        return
+
+    print(
+        f"{'input':<14} {'KB':>6} {'pipeline':<8} {'ms':>8}"
+        f" {'+peak MB':>8} {'result':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        make_inputs(args.photo, Path(tmp))
+        for name, _, _ in INPUTS:
+            path = Path(tmp) / name
+            for pipeline in PIPELINES:
+                command = [sys.executable, __file__, "--repeat", str(args.repeat)]
+                command += ["--run", pipeline, str(path)]
+                output = subprocess.run(
+                    command, check=True, capture_output=True, text=True
+                )
+                result = json.loads(output.stdout)
+                width, height = result["size"]
+                print(
+                    f"{name:<14} {path.stat().st_size // 1024:>6} {pipeline:<8}"
+                    f" {result['seconds'] * 1000:>8.1f} {result['peak_mb']:>8.0f}"
+                    f" {f'{width}x{height}':>10}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of a log call on request threads for each handler setup.
+
+Several threads log in a loop (with a little simulated request work between
+calls) into a temporary directory, and the script reports the per-call
+latency seen by the calling thread (p50/p99/max), the overall rate, and
+how many records the queued handler dropped. Handlers:
+
+    file     logging.FileHandler, the old synchronous setup
+    rotating logging.handlers.RotatingFileHandler
+    queued   chesley_web.queue_logging.QueuedHandler feeding a
+             BatchRotatingFileHandler
+
+Usage:
+    python backend/scripts/bench_logging.py [--threads 8] [--calls 20000] \
+        [--work-us 50]
+"""
+
+import argparse
+import logging
+import logging.handlers
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+from chesley_web.queue_logging import (  # noqa: E402
+    BatchRotatingFileHandler,
+    QueuedHandler,
+)
+
+FORMAT = "{levelname} {asctime} {module} {process:d} {thread:d} {message}"
+MAX_BYTES = 10 * 1024 * 1024
+
+
+def make_handler(kind, path):
+    if kind == "file":
+        return logging.FileHandler(path)
+    if kind == "rotating":
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=MAX_BYTES, backupCount=5
+        )
+    return QueuedHandler(
+        BatchRotatingFileHandler, filename=path, maxBytes=MAX_BYTES, backupCount=5
+    )
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def bench(kind, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = make_handler(kind, str(Path(tmp) / "bench.log"))
+        handler.setFormatter(logging.Formatter(FORMAT, style="{"))
+        logger = logging.getLogger(f"bench.{kind}")
+        logger.handlers = [handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        per_thread = args.calls // args.threads
+        timings = [[] for _ in range(args.threads)]
+
+        def worker(n):
+            record = timings[n]
+            for i in range(per_thread):
+                busy_wait(args.work_us / 1e6)
+                start = time.perf_counter()
+                logger.info("GET /learning/ %s %s 200 %d bytes", n, i, 20480)
+                record.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in range(args.threads)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        dropped = getattr(handler, "dropped", 0)
+        handler.close()
+
+    calls = sorted(t for thread in timings for t in thread)
+    return {
+        "p50_us": calls[len(calls) // 2] * 1e6,
+        "p99_us": calls[int(len(calls) * 0.99)] * 1e6,
+        "max_us": calls[-1] * 1e6,
+        "rate": len(calls) / elapsed,
+        "dropped": dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument(
+        "--work-us", type=float, default=50, help="Simulated work per log call."
+    )
+    parser.add_argument("--handlers", nargs="+", default=["file", "rotating", "queued"])
+    args = parser.parse_args()
+
+    print(
+        f"{'handler':<9} {'p50 us':>8} {'p99 us':>8} {'max us':>9}"
+        f" {'calls/s':>9} {'dropped':>8}"
+    )
+    for kind in args.handlers:
+        r = bench(kind, args)
+        print(
+            f"{kind:<9} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['max_us']:>9.1f}"
+            f" {r['rate']:>9.0f} {r['dropped']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Compare process_images() with a thread pool and a process pool.
+
+The JPEGs under static/images (not the generated -<width>w variants) are
+copied to a scratch input directory and optimized into a temporary
+directory inside static/, with a scratch manifest, so nothing in the tree
+changes. Each mode runs in its own child process so peak memory is its
+own: "parent" is the process_images() caller, "worker" the largest single
+pool process (the same as parent for threads).
+
+Usage:
+    python backend/scripts/bench_optimize_executors.py [--workers 4] \
+        [--limit 8] [--memory-mb 1024] [--modes thread process]
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from optimize_images import STATIC_DIR, process_images
+
+VARIANT = re.compile(r"-\d+w$")
+
+
+def corpus(limit=None):
+    images = [
+        path
+        for path in sorted((STATIC_DIR / "images").rglob("*.jpg"))
+        if not VARIANT.search(path.stem)
+    ]
+    return images[:limit] if limit else images
+
+
+def run_mode(args):
+    """Optimize a copy of the corpus once; print the results as JSON."""
+    images = corpus(args.limit)
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory(
+        dir=STATIC_DIR
+    ) as output_dir:
+        input_dir = Path(tmp) / "input"
+        originals = Path(tmp) / "originals"
+        input_dir.mkdir()
+        originals.mkdir()
+        for index, path in enumerate(images):
+            shutil.copy(path, input_dir / f"{index:03d}-{path.name}")
+        started = time.perf_counter()
+        successful, failed, _ = process_images(
+            input_dir,
+            output_dir,
+            originals,
+            mode=args.run,
+            workers=args.workers,
+            memory_limit=args.memory_mb * 1024 * 1024,
+            manifest_path=Path(tmp) / "responsive.json",
+        )
+        elapsed = time.perf_counter() - started
+    # ru_maxrss is in KB on Linux
+    parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "images": successful,
+                "failed": failed,
+                "seconds": elapsed,
+                "parent_mb": parent / 1024,
+                "worker_mb": max(parent, children) / 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--limit", type=int, help="Only the first N images")
+    parser.add_argument("--memory-mb", type=int, default=1024)
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"])
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        logging.basicConfig(level=logging.WARNING)
+        run_mode(args)
+        return
+
+    print(f"{len(corpus(args.limit))} images, {args.workers} workers")
+    print(
+        f"{'mode':<8} {'images':>6} {'failed':>6} {'seconds':>8}"
+        f" {'img/s':>6} {'parent MB':>9} {'worker MB':>9}"
+    )
+    for mode in args.modes:
+        command = [sys.executable, __file__, "--run", mode]
+        command += ["--workers", str(args.workers), "--memory-mb", str(args.memory_mb)]
+        if args.limit:
+            command += ["--limit", str(args.limit)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:<8} {result['images']:>6} {result['failed']:>6}"
+            f" {result['seconds']:>8.2f} {result['images'] / result['seconds']:>6.2f}"
+            f" {result['parent_mb']:>9.0f} {result['worker_mb']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the old and new quality searches in optimize_images.py per image.
+
+    disk    save to a file, stat it, step quality down by 5 (the old loop)
+    memory  encode_within_limit(): try the start quality, then bisect in
+            a BytesIO and write only the result
+
+Each image is capped at 1200px like optimize_image() does, then searched
+for JPEG (from 95) and WebP (from 90) under its size_limit_for() limit or
+--limit-kb. Reported per image and format: encodes, wall time, the quality
+found and the output size.
+
+Usage:
+    python backend/scripts/bench_quality_search.py [--limit-kb 150] \
+        [static/images/trees/*.jpg ...]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from optimize_images import (
+    MIN_QUALITY,
+    encode_within_limit,
+    project_root,
+    size_limit_for,
+)
+from PIL import Image
+
+FORMATS = [("JPEG", "jpg", 95), ("WEBP", "webp", 90)]
+
+
+def disk_search(img, output_path, format, quality, size_limit):
+    """The loop optimize_image() used before: (quality, size, encodes)."""
+    encodes = 0
+    while True:
+        img.save(output_path, format, quality=quality, optimize=True)
+        encodes += 1
+        size = output_path.stat().st_size
+        if size <= size_limit or quality <= MIN_QUALITY:
+            return quality, size, encodes
+        quality -= 5
+
+
+def memory_search(img, output_path, format, quality, size_limit):
+    data, quality, encodes = encode_within_limit(img, format, quality, size_limit)
+    output_path.write_bytes(data)
+    return quality, len(data), encodes
+
+
+def timed(search, *args):
+    started = time.perf_counter()
+    result = search(*args)
+    return (*result, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("images", nargs="*", type=Path)
+    parser.add_argument("--limit-kb", type=int, help="Override the size limit")
+    args = parser.parse_args()
+    images = args.images or sorted((project_root / "static/images/trees").glob("*.jpg"))
+
+    print(
+        f"{'image':<28} {'fmt':<5} {'limit':>6}"
+        f" {'disk enc':>8} {'ms':>7} {'q':>3} {'KB':>5}"
+        f" {'mem enc':>8} {'ms':>7} {'q':>3} {'KB':>5}"
+    )
+    totals = {"disk": [0, 0.0], "memory": [0, 0.0]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in images:
+            limit = args.limit_kb * 1024 if args.limit_kb else size_limit_for(path)
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                img.thumbnail((1200, 1200))
+                for format, extension, quality in FORMATS:
+                    output_path = Path(tmp) / f"{path.stem}.{extension}"
+                    row = f"{path.name[:28]:<28} {extension:<5} {limit // 1024:>5}K"
+                    for name, search in [
+                        ("disk", disk_search),
+                        ("memory", memory_search),
+                    ]:
+                        q, size, encodes, elapsed = timed(
+                            search, img, output_path, format, quality, limit
+                        )
+                        totals[name][0] += encodes
+                        totals[name][1] += elapsed
+                        row += f" {encodes:>8} {elapsed * 1000:>7.1f} {q:>3} {size // 1024:>5}"
+                    print(row)
+
+    for name, (encodes, elapsed) in totals.items():
+        print(f"{name:<7} {encodes:>5} encodes {elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
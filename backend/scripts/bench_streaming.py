@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Measure time to first byte and peak memory for the notebook project pages.
+
+Each (route, mode) pair runs in a fresh Python process so the peak RSS
+numbers don't leak between runs. Requests go straight through the Django
+WSGI handler, so the numbers exclude gunicorn/nginx and without
+wsgi.file_wrapper the prebuilt files are read in 64KB blocks, not sendfile().
+
+Modes:
+    render    full render() per request (page cache off), the old behaviour
+    stream    STREAMING_PAGES_ENABLED, chunked node-by-node render
+    prebuilt  prebuilt files from `python manage.py build_pages`
+
+Usage:
+    python backend/scripts/bench_streaming.py [--iterations 5] [route ...]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+project_root = Path(__file__).resolve().parent.parent.parent
+
+ROUTES = ["project1", "project2", "project3", "project4", "project5", "project6"]
+
+MODES = {
+    "render": {"PREBUILT_PAGES_ENABLED": "false", "STREAMING_PAGES_ENABLED": "false"},
+    "stream": {"PREBUILT_PAGES_ENABLED": "false", "STREAMING_PAGES_ENABLED": "true"},
+    "prebuilt": {"PREBUILT_PAGES_ENABLED": "true", "STREAMING_PAGES_ENABLED": "false"},
+}
+
+
+def run_request(app, path):
+    """Send one GET through the WSGI app; return (ttfb, total, size)."""
+    environ = {"PATH_INFO": path, "REQUEST_METHOD": "GET"}
+    setup_testing_defaults(environ)
+    start = time.perf_counter()
+    body = app(environ, lambda status, headers, exc_info=None: None)
+    ttfb, size = None, 0
+    try:
+        for chunk in body:
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return ttfb, time.perf_counter() - start, size
+
+
+def child(route, iterations):
+    """Measure one route in this process and print a JSON result line."""
+    sys.path.append(str(project_root))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chesley_web.settings.development")
+
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import reverse
+
+    app = get_wsgi_application()
+    path = reverse(route)
+    run_request(app, path)  # compile the template outside the measurement
+
+    timings = [run_request(app, path) for _ in range(iterations)]
+    tracemalloc.start()
+    _, _, size = run_request(app, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "ttfb_ms": statistics.median(t[0] for t in timings) * 1000,
+        "total_ms": statistics.median(t[1] for t in timings) * 1000,
+        "bytes": size,
+        "py_peak_kb": peak / 1024,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    print(json.dumps(result))
+
+
+def measure(route, mode, iterations):
+    env = dict(os.environ, DEV_DEBUG="false", PAGE_CACHE_ENABLED="false")
+    env.update(MODES[mode])
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", route, "--iterations", str(iterations)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("routes", nargs="*", default=ROUTES)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.iterations)
+        return
+
+    header = f"{'route':<10} {'mode':<9} {'ttfb ms':>9} {'total ms':>9}"
+    header += f" {'bytes':>10} {'py peak KB':>11} {'max RSS KB':>11}"
+    print(header)
+    for route in args.routes:
+        for mode in args.modes:
+            r = measure(route, mode, args.iterations)
+            print(
+                f"{route:<10} {mode:<9} {r['ttfb_ms']:>9.2f} {r['total_ms']:>9.2f}"
+                f" {r['bytes']:>10,} {r['py_peak_kb']:>11,.0f} {r['max_rss_kb']:>11,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
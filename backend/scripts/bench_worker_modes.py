@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn worker models on the site's real routes.
+
+For each mode (sync, gthread, asgi) this starts gunicorn with the project's
+gunicorn.conf.py on a local TCP port. After a short warm-up it drives every
+parameter-free named route in main/urls.py, round-robin, at a fixed
+concurrency for a fixed time. It then reports throughput, p50/p99 latency,
+errors and the resident memory of each worker. The per-worker figure is what
+GUNICORN_WORKER_MEMORY_MB should be set to in production. The route list and
+the HTTP driver are shared with loadtest.py.
+
+The asgi mode needs uvicorn installed and is skipped otherwise.
+
+Usage:
+    python backend/scripts/bench_worker_modes.py [--concurrency 16] \
+        [--duration 20] [--workers N] [--modes sync gthread asgi]
+"""
+
+import argparse
+import importlib.util
+
+from loadtest import (
+    drive,
+    free_port,
+    named_routes,
+    percentile,
+    setup_django,
+    start_server,
+    stop_server,
+    worker_rss_mb,
+)
+
+MODES = ["sync", "gthread", "asgi"]
+
+
+def bench(mode, paths, args):
+    port = free_port()
+    process = start_server(port, mode, args.workers)
+    try:
+        drive(port, paths, args.concurrency, duration=min(3, args.duration))
+        latencies, failures, _, elapsed = drive(
+            port, paths, args.concurrency, duration=args.duration
+        )
+        rss = worker_rss_mb(process.pid)
+    finally:
+        stop_server(process)
+    if not latencies:
+        raise RuntimeError(f"No successful requests in {mode} mode")
+    return {
+        "rps": (len(latencies) + len(failures)) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": len(failures),
+        "workers": len(rss),
+        "worker_mb": max(rss, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument(
+        "--workers", type=int, help="Fix the worker count instead of auto-tuning."
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    paths = [path for _, path in named_routes()]
+
+    print(
+        f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'errors':>7} {'workers':>8} {'MB/worker':>10}"
+    )
+    for mode in args.modes:
+        if mode == "asgi" and importlib.util.find_spec("uvicorn") is None:
+            print(f"{mode:<8} skipped (uvicorn not installed)")
+            continue
+        r = bench(mode, paths, args)
+        print(
+            f"{mode:<8} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            f" {r['errors']:>7} {r['workers']:>8} {r['worker_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
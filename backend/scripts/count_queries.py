@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Count database queries and time per page view for each kind of visitor.
+
+Every parameter-free named route is requested through the full middleware
+stack (Django test client, throwaway test database) as:
+
+    cookieless  anonymous, no cookies (first and repeat view)
+    stale       anonymous with a session cookie that no longer exists
+    logged-in   an authenticated user
+
+Repeat cookieless views are answered by PageCacheFastPathMiddleware when
+the page is in the page cache. The "saved" column is how many queries a
+cookieless repeat view avoids compared with a logged-in one. The stale
+and logged-in rows count the queries of the first request only. Pass
+--no-fast-path to measure the same visits with the fast path switched off.
+
+Usage:
+    python backend/scripts/count_queries.py [--repeat 20] [--no-fast-path]
+"""
+
+import argparse
+import time
+
+from loadtest import named_routes, setup_django
+
+STATES = ["cookieless", "cookieless repeat", "stale", "logged-in"]
+
+
+def visit(client, path, repeat):
+    """(queries on the first request, mean ms per request) for ``repeat`` GETs.
+
+    Only the first request counts queries: a stale session cookie is
+    deleted by that response, so later requests no longer carry it.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        client.get(path)
+    # Read now: the next request_started signal clears connection.queries.
+    count = len(queries)
+    for _ in range(repeat - 1):
+        client.get(path)
+    return count, (time.perf_counter() - started) / repeat * 1000
+
+
+def stale_client(settings):
+    from django.test import Client
+
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = "0" * 32
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-fast-path", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import setup_databases, setup_test_environment
+
+    setup_test_environment()
+    setup_databases(verbosity=0, interactive=False)
+    settings.PAGE_CACHE_FAST_PATH = not args.no_fast_path
+    user = get_user_model().objects.create_user("bench", "bench@example.com", "pw")
+
+    clients = {"cookieless": Client(), "logged-in": Client()}
+    clients["logged-in"].force_login(user)
+
+    print(f"{'route':<28}" + "".join(f" {state:>22}" for state in STATES) + " saved")
+    totals = dict.fromkeys(STATES, 0)
+    routes = named_routes()
+    for name, path in routes:
+        results = {
+            "cookieless": visit(clients["cookieless"], path, 1),
+            "cookieless repeat": visit(clients["cookieless"], path, args.repeat),
+            "stale": visit(stale_client(settings), path, args.repeat),
+            "logged-in": visit(clients["logged-in"], path, args.repeat),
+        }
+        for state, (queries, _) in results.items():
+            totals[state] += queries
+        cells = "".join(
+            f" {queries:>3} q {ms:>7.2f} ms{'':>7}" for queries, ms in results.values()
+        )
+        saved = results["logged-in"][0] - results["cookieless repeat"][0]
+        print(f"{name:<28}{cells} {saved:>5}")
+
+    summary = "".join(
+        f" {totals[state] / len(routes):>8.2f} q/view{'':>7}" for state in STATES
+    )
+    print(f"{'mean':<28}{summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Add placeholders for images already in static/ to the responsive manifest.
+
+optimize_images.py records a placeholder and dominant colour for each image
+it processes. This does the same for images that are already published
+(the tree and succulent galleries) without re-encoding them: every .jpg,
+.jpeg and .png under the given directories, except the -<width>w variants,
+gets its intrinsic size, "placeholder" and "color" merged into
+static/images/responsive.json under its static path.
+
+With --ladder, images that have no variants in the manifest yet also get
+optimize_images.py's width ladder (<stem>-<width>w.avif/.webp/.jpg) written
+next to them, so {% responsive_image %} can give them srcsets.
+
+Usage:
+    python backend/scripts/image_placeholders.py [--ladder] [static/images/trees ...]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from optimize_images import (
+    STATIC_DIR,
+    logger,
+    placeholder,
+    save_responsive_variants,
+    setup_django,
+    size_limit_for,
+    update_manifest,
+)
+from PIL import Image
+
+EXTENSIONS = {".jpg", ".jpeg", ".png"}
+VARIANT = re.compile(r"-\d+w$")
+
+
+def published_images(directories):
+    for directory in directories:
+        for path in sorted(directory.rglob("*")):
+            if path.suffix.lower() in EXTENSIONS and not VARIANT.search(path.stem):
+                yield path
+
+
+def entry_for(path, ladder=False):
+    with Image.open(path) as img:
+        entry = {
+            "key": path.resolve().relative_to(STATIC_DIR.resolve()).as_posix(),
+            "width": img.width,
+            "height": img.height,
+            **placeholder(img),
+        }
+        if ladder:
+            variants = save_responsive_variants(
+                img.convert("RGB"), path.stem, path.parent, size_limit_for(path)
+            )
+            entry["sources"] = variants["sources"]
+        return entry
+
+
+def has_variants(path):
+    key = path.resolve().relative_to(STATIC_DIR.resolve()).as_posix()
+    try:
+        with open(settings.RESPONSIVE_IMAGES_MANIFEST) as f:
+            return "sources" in json.load(f).get(key, {})
+    except FileNotFoundError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "directories",
+        nargs="*",
+        type=Path,
+        default=[STATIC_DIR / "images" / "trees", STATIC_DIR / "images" / "succulents"],
+    )
+    parser.add_argument(
+        "--ladder",
+        action="store_true",
+        help="also write width-ladder variants for images that have none",
+    )
+    args = parser.parse_args()
+    setup_django()
+
+    entries = []
+    for path in published_images(args.directories):
+        try:
+            entries.append(entry_for(path, args.ladder and not has_variants(path)))
+        except (OSError, ValueError) as exc:
+            logger.error(f"Skipping {path}: {exc}")
+    if not entries:
+        print("No images found", file=sys.stderr)
+        return 1
+    update_manifest(entries)
+    print(f"Placeholders for {len(entries)} images")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Load-test every named route in main/urls.py against a local gunicorn.
+
+The harness starts gunicorn with the project's gunicorn.conf.py on a free
+local port, then for each parameter-free named URL sends a fixed number of
+GET requests at a fixed concurrency (after a few warm-up requests). It
+records p50/p95/p99 latency and throughput per route, overall throughput,
+and the resident memory of each worker.
+
+Results are compared against a saved baseline: a route whose p95 grows, or
+an overall throughput that drops, by more than --threshold (default 15%)
+is reported as a regression and the script exits with status 1. Small
+absolute changes (under --min-delta-ms) are ignored as noise. Baselines
+are machine-specific; record one on the machine you compare on.
+
+Usage:
+    python backend/scripts/loadtest.py --save-baseline
+    python backend/scripts/loadtest.py [--concurrency 8] [--requests 200] \
+        [--mode gthread] [--workers N] [--threshold 0.15] [--output run.json] \
+        [route_name ...]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+DEFAULT_BASELINE = project_root / "backend" / "perf" / "baseline.json"
+# LogoutView only accepts POST since Django 5.0; metrics is staff-only.
+SKIP_ROUTES = {"logout", "metrics"}
+
+
+def setup_django():
+    sys.path.append(str(project_root))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chesley_web.settings.development")
+    import django
+
+    django.setup()
+
+
+def named_routes():
+    """(name, path) for every named URL in main.urls that takes no arguments."""
+    from django.urls import NoReverseMatch, URLResolver, reverse
+
+    from main import urls
+
+    routes = {}
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif pattern.name in SKIP_ROUTES:
+                continue
+            elif pattern.name and not pattern.pattern.regex.groups:
+                try:
+                    routes.setdefault(reverse(pattern.name), pattern.name)
+                except NoReverseMatch:
+                    continue
+
+    walk(urls.urlpatterns)
+    return [(name, path) for path, name in routes.items()]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, mode=None, workers=None):
+    """Start gunicorn on 127.0.0.1:port and wait until it accepts connections."""
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="chesley_web.settings.development",
+        DEV_DEBUG="false",
+    )
+    if mode:
+        env["GUNICORN_WORKER_MODE"] = mode
+    if workers:
+        env["GUNICORN_WORKERS"] = str(workers)
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "--config",
+        "gunicorn.conf.py",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--access-logfile",
+        "/dev/null",
+        "--error-logfile",
+        "-",
+        "--log-level",
+        "warning",
+    ]
+    process = subprocess.Popen(command, cwd=project_root, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {process.returncode}")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start listening")
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(timeout=30)
+
+
+def worker_rss_mb(master_pid):
+    """Resident memory in MB of each worker forked by ``master_pid``."""
+    rss = []
+    for status in Path("/proc").glob("[0-9]*/status"):
+        try:
+            fields = dict(
+                line.split(":", 1) for line in status.read_text().splitlines()
+            )
+        except (OSError, ValueError):
+            continue
+        if int(fields.get("PPid", "0")) == master_pid:
+            rss.append(int(fields["VmRSS"].split()[0]) / 1024)
+    return sorted(rss)
+
+
+def fetch(conn, path):
+    """GET ``path`` on a keep-alive connection; return the status or "error"."""
+    try:
+        conn.request("GET", path, headers={"Accept-Encoding": "gzip, br"})
+        response = conn.getresponse()
+        response.read()
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        return "error"
+    if response.getheader("Connection", "").lower() == "close":
+        conn.close()
+    return response.status
+
+
+def drive(port, paths, concurrency, requests=None, duration=None):
+    """GET ``paths`` round-robin from ``concurrency`` keep-alive clients.
+
+    Stops after ``requests`` requests in total or ``duration`` seconds.
+    Returns (latencies of responses below 500, failure latencies, status
+    counts, elapsed seconds).
+    """
+    latencies, failures, statuses = [], [], Counter()
+    lock = threading.Lock()
+    budget = iter(range(requests)) if requests is not None else None
+    stop_at = time.monotonic() + duration if duration else None
+
+    def take():
+        if budget is not None and next(budget, None) is None:
+            return False
+        return stop_at is None or time.monotonic() < stop_at
+
+    def client(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i = offset
+        while take():
+            start = time.perf_counter()
+            status = fetch(conn, paths[i % len(paths)])
+            elapsed = time.perf_counter() - start
+            i += 1
+            with lock:
+                statuses[status] += 1
+                failed = status == "error" or status >= 500
+                (failures if failed else latencies).append(elapsed)
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, failures, statuses, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarise(latencies, failures, statuses, elapsed):
+    summary = {
+        "requests": len(latencies) + len(failures),
+        "failures": len(failures),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "rps": (len(latencies) + len(failures)) / elapsed,
+    }
+    if latencies:
+        for label, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            summary[label] = percentile(latencies, fraction) * 1000
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(routes, args):
+    port = free_port()
+    process = start_server(port, args.mode, args.workers)
+    results, all_latencies, total_requests, total_elapsed = {}, [], 0, 0.0
+    try:
+        for name, path in routes:
+            drive(port, [path], args.concurrency, requests=args.warmup)
+            latencies, failures, statuses, elapsed = drive(
+                port, [path], args.concurrency, requests=args.requests
+            )
+            results[name] = dict(
+                summarise(latencies, failures, statuses, elapsed), path=path
+            )
+            all_latencies.extend(latencies)
+            total_requests += len(latencies) + len(failures)
+            total_elapsed += elapsed
+        rss = worker_rss_mb(process.pid)
+    finally:
+        stop_server(process)
+
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "mode": args.mode or os.environ.get("GUNICORN_WORKER_MODE", "gthread"),
+            "workers": len(rss),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "total": {
+            "requests": total_requests,
+            "rps": total_requests / total_elapsed if total_elapsed else 0.0,
+            "p50_ms": percentile(all_latencies, 0.50) * 1000,
+            "p95_ms": percentile(all_latencies, 0.95) * 1000,
+            "p99_ms": percentile(all_latencies, 0.99) * 1000,
+        },
+        "worker_rss_mb": rss,
+        "routes": results,
+    }
+
+
+def overall_rps(routes):
+    routes = list(routes)
+    elapsed = sum(r["requests"] / r["rps"] for r in routes if r["rps"])
+    return sum(r["requests"] for r in routes) / elapsed if elapsed else 0.0
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Return a list of regression messages (empty when within threshold)."""
+    regressions = []
+    for name, route in current["routes"].items():
+        before = baseline["routes"].get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in route:
+            continue
+        delta = route["p95_ms"] - before["p95_ms"]
+        if delta > min_delta_ms and route["p95_ms"] > before["p95_ms"] * (
+            1 + threshold
+        ):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.1f} -> {route['p95_ms']:.1f} ms"
+            )
+    # Throughput over the routes both runs measured, so a partial run still
+    # compares like with like.
+    common = [name for name in current["routes"] if name in baseline["routes"]]
+    rps = overall_rps(current["routes"][name] for name in common)
+    base_rps = overall_rps(baseline["routes"][name] for name in common)
+    if common and rps < base_rps * (1 - threshold):
+        regressions.append(f"throughput: {base_rps:.1f} -> {rps:.1f} req/s")
+    return regressions
+
+
+def check_baseline(current, baseline, threshold, min_delta_ms):
+    """Print regressions against ``baseline``; return True if there are any."""
+    for key in ("mode", "workers", "concurrency", "cpus"):
+        if baseline["meta"].get(key) != current["meta"][key]:
+            print(f"Warning: baseline {key} differs ({baseline['meta'].get(key)})")
+    regressions = compare(current, baseline, threshold, min_delta_ms)
+    if regressions:
+        print(f"\nRegressions against {baseline['meta'].get('revision')}:")
+        for line in regressions:
+            print(f"  {line}")
+        return True
+    print(f"\nNo regressions beyond {threshold:.0%} of the baseline.")
+    return False
+
+
+def report(current, baseline):
+    print(
+        f"{'route':<28} {'status':<10} {'req/s':>8} {'p50 ms':>8}"
+        f" {'p95 ms':>8} {'p99 ms':>8} {'base p95':>9}"
+    )
+    for name, r in current["routes"].items():
+        statuses = ",".join(r["statuses"])
+        base = (baseline or {}).get("routes", {}).get(name, {}).get("p95_ms")
+        base = f"{base:>9.1f}" if base is not None else f"{'-':>9}"
+        if "p95_ms" not in r:
+            print(f"{name:<28} {statuses:<10} {'all requests failed':>35}")
+            continue
+        print(
+            f"{name:<28} {statuses:<10} {r['rps']:>8.1f} {r['p50_ms']:>8.1f}"
+            f" {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {base}"
+        )
+    t = current["total"]
+    print(
+        f"\n{t['requests']} requests, {t['rps']:.1f} req/s, p50 {t['p50_ms']:.1f} ms,"
+        f" p95 {t['p95_ms']:.1f} ms, p99 {t['p99_ms']:.1f} ms"
+    )
+    rss = ", ".join(f"{mb:.1f}" for mb in current["worker_rss_mb"])
+    print(f"Worker RSS (MB): {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("routes", nargs="*", help="Route names (default: all).")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Per route.")
+    parser.add_argument("--warmup", type=int, default=20, help="Per route.")
+    parser.add_argument("--mode", choices=["sync", "gthread", "asgi"])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    parser.add_argument("--output", type=Path, help="Also write this run's JSON here.")
+    args = parser.parse_args()
+
+    setup_django()
+    routes = named_routes()
+    if args.routes:
+        unknown = set(args.routes) - {name for name, _ in routes}
+        if unknown:
+            parser.error(f"Unknown routes: {', '.join(sorted(unknown))}")
+        routes = [(name, path) for name, path in routes if name in args.routes]
+
+    current = run(routes, args)
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+    report(current, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return
+
+    if check_baseline(current, baseline, args.threshold, args.min_delta_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
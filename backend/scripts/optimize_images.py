@@ -1,15 +1,30 @@
+import base64
+import hashlib
+import io
+import json
 import logging
+import math
+import multiprocessing
 import os
 import shutil
 import sys
+import threading
+import time
 import warnings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import datetime
 from pathlib import Path
 
+import django
 import environ
 from django.conf import settings
 from PIL import Image, ImageFile
+from PIL import __version__ as pillow_version
 
 warnings.filterwarnings("ignore", category=UserWarning, module="PIL")
 
@@ -17,188 +32,588 @@ warnings.filterwarnings("ignore", category=UserWarning, module="PIL")
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(project_root))
 
-# Initialize environ and read .env.dev file
-env = environ.Env()
-env_file = os.path.join(project_root, ".env.dev")
-print(f"Reading environment variables from: {env_file}")
-environ.Env.read_env(env_file)
-
-# Set up Django environment
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chesley_web.settings.development")
-
-# Set log directory
-LOG_DIR = settings.LOG_DIR
-print(f"LOG_DIR: {LOG_DIR}")
-
-import django
-
-django.setup()
-
 # Allow truncated images to be processed
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
-# Read directory paths from environment variables
-INPUT_DIR = Path(env("INPUT_DIR"))
-OUTPUT_DIR = Path(env("OUTPUT_DIR"))
-ORIGINAL_DIR = Path(env("ORIGINAL_DIR"))
-
-print(f"INPUT_DIR: {INPUT_DIR}")
-print(f"OUTPUT_DIR: {OUTPUT_DIR}")
-print(f"ORIGINAL_DIR: {ORIGINAL_DIR}")
-print(f"LOG_DIR: {LOG_DIR}")
-
-# Ensure log directory exists
-LOG_DIR.mkdir(parents=True, exist_ok=True)
-print(f"Attempted to create LOG_DIR: {LOG_DIR}")
-print(f"LOG_DIR exists: {os.path.exists(LOG_DIR)}")
-print(f"LOG_DIR is writable: {os.access(LOG_DIR, os.W_OK)}")
-
-# Set up logging configuration
-log_filename = f'image_optimization_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-log_file_path = LOG_DIR / log_filename
-
-try:
-    logging.basicConfig(
-        filename=str(log_file_path),
-        level=logging.DEBUG,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
-    # Add StreamHandler to also log to console
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    console_handler.setFormatter(formatter)
-    logging.getLogger().addHandler(console_handler)
-    print("Logging configuration completed.")
-except Exception as e:
-    print(f"Failed to set up logging: {str(e)}")
-    sys.exit(1)
-
-# Define logger
 logger = logging.getLogger(__name__)
 
-# Guaranteed logging
-logger.critical("Script started")
-
 # Size limits by image type
 MAX_FILE_SIZES = {
     "thumbnail": 100 * 1024,  # 100KB for thumbnails like odin_small, pgp-aiml-small
     "standard": 300 * 1024,  # 300KB for regular images
     "large": 500 * 1024,  # 500KB for high-detail images like your tree photos
 }
+# Lowest quality the size search goes to; the result is kept even if too big
+MIN_QUALITY = 20
+# <name>.jpg/.webp: bounding box and initial qualities
+MAX_SIZE = (1200, 1200)
+JPEG_QUALITY = 95
+WEBP_QUALITY = 90
+
+# process_images() pool: "thread" or "process", and the decoded-pixel budget
+# for images in flight at once. Threads stay the default; set
+# OPTIMIZE_EXECUTOR=process to use several cores.
+DEFAULT_EXECUTOR = "thread"
+DEFAULT_MEMORY_MB = 1024
+
+# Width ladder for srcset; images narrower than a step stop at their own width
+RESPONSIVE_WIDTHS = (320, 640, 960, 1200)
+# (Pillow format, extension, initial quality) for each responsive variant
+RESPONSIVE_FORMATS = [("AVIF", "avif", 50), ("WEBP", "webp", 80), ("JPEG", "jpg", 82)]
+STATIC_DIR = project_root / "static"
+# Inline placeholder: a WebP this wide, stretched (and so blurred) by the
+# browser until the image loads
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 50
+
+
+def setup_django():
+    """Read .env.dev and the development settings; return the environ.Env."""
+    # Initialize environ and read .env.dev file
+    env = environ.Env()
+    env_file = os.path.join(project_root, ".env.dev")
+    print(f"Reading environment variables from: {env_file}")
+    environ.Env.read_env(env_file)
+
+    # Set up Django environment
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chesley_web.settings.development")
+    django.setup()
+    return env
+
+
+def setup_logging(log_dir):
+    """Log to a timestamped file in log_dir and to stdout; return the file path."""
+    print(f"LOG_DIR: {log_dir}")
+    log_dir.mkdir(parents=True, exist_ok=True)
+    print(f"LOG_DIR exists: {os.path.exists(log_dir)}")
+    print(f"LOG_DIR is writable: {os.access(log_dir, os.W_OK)}")
+
+    log_filename = f'image_optimization_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
+    log_file_path = log_dir / log_filename
+    try:
+        logging.basicConfig(
+            filename=str(log_file_path),
+            level=logging.DEBUG,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+        )
+        # Add StreamHandler to also log to console
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        console_handler.setFormatter(formatter)
+        logging.getLogger().addHandler(console_handler)
+        print("Logging configuration completed.")
+    except Exception as e:
+        print(f"Failed to set up logging: {str(e)}")
+        sys.exit(1)
+    return log_file_path
+
+
+def fit(size, max_size):
+    """``size`` scaled down to fit in ``max_size``, rounded up."""
+    ratio = min(max_size[0] / size[0], max_size[1] / size[1], 1)
+    return math.ceil(size[0] * ratio), math.ceil(size[1] * ratio)
 
 
-def is_image_file(file_path):
-    """Check if a file is a valid image file."""
+def open_image(path, max_size=MAX_SIZE):
+    """Open an image, set to decode no larger than fitting it in ``max_size`` needs.
+
+    Only the header is read. For JPEGs, draft() picks the largest DCT scale
+    (1/2, 1/4 or 1/8) that still covers the final size, so a 4032x3024
+    photo decodes at 2016x1512. img.size is the size it will decode to.
+    """
+    img = Image.open(path)
+    img.draft(None, fit(img.size, max_size))
+    return img
+
+
+def probe(path):
+    """Bytes the image will take once decoded, or None if it isn't an image."""
     try:
-        with Image.open(file_path) as img:
-            img.verify()
-        return True
-    except (IOError, SyntaxError):
-        logger.info(f"File {file_path} is not a valid image.")
-        return False
-    except Exception as e:
-        logger.error(f"Unexpected error when checking {file_path}: {str(e)}")
-        return False
+        with open_image(path) as img:
+            return img.width * img.height * len(img.getbands())
+    except (OSError, SyntaxError, ValueError):
+        logger.info(f"File {path} is not a valid image.")
+        return None
+
+
+def size_limit_for(input_path):
+    """File size limit for an image, based on its name."""
+    if any(x in input_path.stem.lower() for x in ["small", "thumb"]):
+        return MAX_FILE_SIZES["thumbnail"]
+    if any(x in str(input_path).lower() for x in ["tree", "fig", "pomegranite"]):
+        return MAX_FILE_SIZES["large"]
+    return MAX_FILE_SIZES["standard"]
+
+
+def encode(img, format, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def encode_within_limit(img, format, quality, size_limit):
+    """Encode at the highest quality on the old 5-step ladder that fits.
+
+    The candidates are quality, quality - 5, ... down to the first one at or
+    below MIN_QUALITY, as the disk loop used to try them one by one. Here
+    they are encoded into memory: the start quality, then steps of 1, 2, 4,
+    ... candidates down until one fits, then bisection in the last gap. That
+    is two encodes when the first step down fits and at most nine instead of
+    sixteen when nothing does. Returns (data, quality, encodes); if nothing
+    fits, data is the lowest candidate's encoding.
+    """
+    candidates = list(range(quality, MIN_QUALITY - 5, -5)) or [quality]
+    encoded = {}
+
+    def fits(index):
+        encoded[index] = encode(img, format, candidates[index])
+        return len(encoded[index]) <= size_limit
+
+    last = len(candidates) - 1
+    if fits(0) or last == 0:
+        return encoded[0], candidates[0], len(encoded)
+
+    # Gallop down: ``low`` is too big, find a ``high`` that fits.
+    low, step = 0, 1
+    while True:
+        high = min(low + step, last)
+        if fits(high):
+            break
+        if high == last:
+            return encoded[last], candidates[last], len(encoded)
+        low, step = high, step * 2
+
+    while high - low > 1:
+        mid = (low + high) // 2
+        if fits(mid):
+            high = mid
+        else:
+            low = mid
+    return encoded[high], candidates[high], len(encoded)
+
+
+def save_within_limit(img, output_path, format, quality, size_limit):
+    """Write the encoding from encode_within_limit; return (quality, encodes)."""
+    data, quality, encodes = encode_within_limit(img, format, quality, size_limit)
+    output_path.write_bytes(data)
+    return quality, encodes
+
+
+def ladder_widths(width, widths=RESPONSIVE_WIDTHS):
+    """Widths to generate for an image that is ``width`` pixels wide."""
+    largest = min(width, widths[-1])
+    return [w for w in widths if w < largest] + [largest]
+
+
+def save_responsive_variants(
+    img, stem, output_dir, size_limit, formats=RESPONSIVE_FORMATS
+):
+    """Write ``<stem>-<width>w.<ext>`` in each format; return the manifest entry.
+
+    ``img`` is already capped to the largest width. Variant paths in the entry
+    are relative to static/ so templates can pass them to {% static %}.
+    """
+    relative_dir = output_dir.resolve().relative_to(STATIC_DIR.resolve())
+    sources = {extension: [] for _, extension, _ in formats}
+    for width in ladder_widths(img.width):
+        height = round(img.height * width / img.width)
+        resized = (
+            img if width == img.width else img.resize((width, height), Image.LANCZOS)
+        )
+        for format, extension, quality in formats:
+            name = f"{stem}-{width}w.{extension}"
+            save_within_limit(resized, output_dir / name, format, quality, size_limit)
+            sources[extension].append([(relative_dir / name).as_posix(), width])
+    return {
+        "key": (relative_dir / f"{stem}.jpg").as_posix(),
+        "width": img.width,
+        "height": img.height,
+        "sources": sources,
+    }
+
+
+def placeholder(img):
+    """Inline preview of ``img``: {"placeholder": data URI, "color": "#rrggbb"}.
+
+    The preview is a PLACEHOLDER_WIDTH-wide WebP, a couple of hundred bytes
+    as base64; stretched over the image's box, the browser's smoothing blurs
+    it. The colour is the largest of four median-cut clusters.
+    """
+    small = img.convert("RGB")
+    small.thumbnail((64, 64), Image.BOX)
+    quantized = small.quantize(colors=4, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3 : index * 3 + 3]  # noqa: E203
+
+    height = max(1, round(small.height * PLACEHOLDER_WIDTH / small.width))
+    tiny = small.resize((PLACEHOLDER_WIDTH, height), Image.BOX)
+    data = encode(tiny, "WEBP", PLACEHOLDER_QUALITY)
+    return {
+        "placeholder": f"data:image/webp;base64,{base64.b64encode(data).decode()}",
+        "color": f"#{red:02x}{green:02x}{blue:02x}",
+    }
+
+
+def update_manifest(entries, manifest_path=None):
+    """Merge new entries into the responsive image manifest.
+
+    Fields are merged per image, so an entry with only a placeholder keeps
+    the variants already recorded for it, and vice versa.
+    """
+    manifest_path = Path(manifest_path or settings.RESPONSIVE_IMAGES_MANIFEST)
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except FileNotFoundError:
+        manifest = {}
+    for entry in entries:
+        key = entry.pop("key")
+        manifest[key] = {**manifest.get(key, {}), **entry}
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    logger.info(f"Wrote {len(entries)} entries to {manifest_path}")
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def output_fingerprints(size_limit):
+    """{output group: hash of the settings that produce it}.
+
+    Groups are "jpg" and "webp" (<name>.<ext>), "<ext>-ladder" for each
+    responsive format and "placeholder", so changing, say, the AVIF quality
+    only invalidates the AVIF ladder.
+    """
+    common = {
+        "pillow": pillow_version,
+        "max_size": list(MAX_SIZE),
+        "min_quality": MIN_QUALITY,
+        "size_limit": size_limit,
+    }
+    groups = {
+        "jpg": {"format": "JPEG", "quality": JPEG_QUALITY},
+        "webp": {"format": "WEBP", "quality": WEBP_QUALITY},
+    }
+    groups["placeholder"] = {
+        "width": PLACEHOLDER_WIDTH,
+        "quality": PLACEHOLDER_QUALITY,
+    }
+    for format, extension, quality in RESPONSIVE_FORMATS:
+        groups[f"{extension}-ladder"] = {
+            "format": format,
+            "quality": quality,
+            "widths": list(RESPONSIVE_WIDTHS),
+        }
+    return {
+        name: hashlib.sha256(
+            json.dumps({**common, **group}, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        for name, group in groups.items()
+    }
+
+
+def group_outputs(group, stem, output_dir, entry):
+    """Files written for an output group, to check they are still there."""
+    if group == "placeholder":
+        return []
+    if group.endswith("-ladder"):
+        extension = group.removesuffix("-ladder")
+        return [STATIC_DIR / path for path, _ in entry["sources"].get(extension, [])]
+    return [output_dir / f"{stem}.{group}"]
+
+
+def load_cache(cache_path):
+    try:
+        return json.loads(Path(cache_path).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    cache_path = Path(cache_path)
+    tmp_path = cache_path.with_name(f".{cache_path.name}.tmp")
+    tmp_path.write_text(json.dumps(cache, indent=1, sort_keys=True))
+    tmp_path.replace(cache_path)
+
+
+def fresh_groups(record, stem, output_dir, fingerprints):
+    """Output groups of a cached record that can be kept as they are."""
+    if record is None or record["stem"] != stem:
+        return set()
+    fresh = set()
+    for group, fingerprint in fingerprints.items():
+        outputs = group_outputs(group, stem, output_dir, record["entry"])
+        if record["outputs"].get(group) == fingerprint and all(
+            path.exists() for path in outputs
+        ):
+            fresh.add(group)
+    return fresh
 
 
 def optimize_image(
     input_path,
     output_dir,
     original_dir,
-    max_size=(1200, 1200),
-    initial_jpeg_quality=95,
-    initial_webp_quality=90,
+    max_size=MAX_SIZE,
+    initial_jpeg_quality=JPEG_QUALITY,
+    initial_webp_quality=WEBP_QUALITY,
+    fresh=(),
+    previous=None,
 ):
-    """Optimize an image file by resizing and converting to JPEG and WebP formats."""
+    """Optimize an image file by resizing and converting to JPEG and WebP formats.
+
+    Also writes the responsive width ladder in AVIF, WebP and JPEG. Output
+    groups in ``fresh`` (see output_fingerprints) are left alone; their
+    ladder sources come from ``previous``, the cached manifest entry.
+    Returns the manifest entry for the image, or None if it failed.
+    """
     logger.info(f"Processing file: {input_path}")
     try:
         # Determine file size limit based on filename
-        if any(x in input_path.stem.lower() for x in ["small", "thumb"]):
-            size_limit = MAX_FILE_SIZES["thumbnail"]
-        elif any(x in str(input_path).lower() for x in ["tree", "fig", "pomegranite"]):
-            size_limit = MAX_FILE_SIZES["large"]
-        else:
-            size_limit = MAX_FILE_SIZES["standard"]
-
-        with Image.open(input_path) as img:
-            if img.mode == "RGBA":
-                img = img.convert("RGB")
+        size_limit = size_limit_for(input_path)
 
+        # Decoding happens here, once; a corrupt file fails here too.
+        with open_image(input_path, max_size) as img:
             if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
                 img.thumbnail(max_size)
 
+            # After the resize, so it only touches the smaller image
+            if img.mode == "RGBA":
+                img = img.convert("RGB")
+
             for format, quality, extension in [
                 ("JPEG", initial_jpeg_quality, "jpg"),
                 ("WEBP", initial_webp_quality, "webp"),
             ]:
+                if extension in fresh:
+                    continue
                 output_path = output_dir / f"{input_path.stem}.{extension}"
-                while True:
-                    img.save(output_path, format, quality=quality, optimize=True)
-                    if output_path.stat().st_size <= size_limit or quality <= 20:
-                        break
-                    quality -= 5
+                save_within_limit(img, output_path, format, quality, size_limit)
+
+            formats = [f for f in RESPONSIVE_FORMATS if f"{f[1]}-ladder" not in fresh]
+            entry = save_responsive_variants(
+                img, input_path.stem, output_dir, size_limit, formats
+            )
+            if previous:
+                entry["sources"] = {**previous["sources"], **entry["sources"]}
+            entry.update(placeholder(img))
 
-            original_path = original_dir / input_path.name
-            shutil.move(str(input_path), str(original_path))
+        original_path = original_dir / input_path.name
+        shutil.move(str(input_path), str(original_path))
 
         logger.info(
             f"Successfully optimized: {input_path} (limit: {size_limit / 1024: .0f}KB)"
         )
-        return True
+        return entry
     except Exception as e:
         logger.error(f"Error optimizing {input_path}: {str(e)}")
-        return False
+        return None
+
+
+def worker_name():
+    """Name of the pool worker running this call, for progress reports."""
+    process = multiprocessing.current_process()
+    if process.name != "MainProcess":
+        return f"{process.name} (pid {process.pid})"
+    return threading.current_thread().name
 
 
-def process_images(input_dir, output_dir, original_dir):
-    """Process all images in the input directory."""
+def run_optimize_image(input_path, output_dir, original_dir, fresh, previous):
+    """optimize_image() plus who ran it and how long it took."""
+    started = time.perf_counter()
+    entry = optimize_image(
+        input_path, output_dir, original_dir, fresh=fresh, previous=previous
+    )
+    return entry, worker_name(), time.perf_counter() - started
+
+
+def make_executor(mode, workers):
+    if mode == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor mode {mode!r}; use 'thread' or 'process'")
+
+
+def run_pool(tasks, output_dir, original_dir, mode, workers, memory_limit):
+    """Yield (task, entry, worker, seconds) as images finish.
+
+    ``tasks`` is an iterable of (file, sha256, decoded size, fresh groups,
+    previous entry), consumed only as pool slots free up.
+
+    At most ``workers`` images are in flight, and fewer if their decoded
+    sizes would add up to more than ``memory_limit`` bytes (one image is
+    always allowed, however large).
+    """
+    tasks = iter(tasks)
+    task = next(tasks, None)
+    in_flight = {}
+    with make_executor(mode, workers) as executor:
+        while task or in_flight:
+            while task and len(in_flight) < workers:
+                file, _, size, fresh, previous = task
+                in_use = sum(queued[2] for queued in in_flight.values())
+                if in_flight and in_use + size > memory_limit:
+                    break
+                future = executor.submit(
+                    run_optimize_image, file, output_dir, original_dir, fresh, previous
+                )
+                in_flight[future] = task
+                task = next(tasks, None)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished = in_flight.pop(future)
+                try:
+                    entry, worker, seconds = future.result()
+                except Exception as exc:
+                    logger.error(f"{finished[0]} generated an exception: {exc}")
+                    entry, worker, seconds = None, "?", 0.0
+                yield finished, entry, worker, seconds
+
+
+def log_worker_summary(per_worker, elapsed):
+    for worker, (count, busy) in sorted(per_worker.items()):
+        logger.info(
+            f"{worker}: {count} images, busy {busy:.1f}s"
+            f" ({busy / elapsed:.0%} of {elapsed:.1f}s)"
+        )
+
+
+def plan_images(files, output_dir, original_dir, cache, skipped):
+    """Yield a task for each input that needs work; see run_pool().
+
+    Files are read one at a time as the pool asks for more: the header to
+    check it is an image and size it (non-images are logged and left
+    alone), then the content hash. An input is done when the cache has
+    its hash under the same name, with every output group's settings
+    fingerprint unchanged and its files present. Done inputs are moved to
+    ``original_dir`` like processed ones and their cached manifest entries
+    appended to ``skipped``. Other tasks keep whichever groups are fresh.
+    """
+    for file in files:
+        size = probe(file)
+        if size is None:
+            continue
+        sha256 = file_sha256(file)
+        record = cache.get(sha256)
+        fingerprints = output_fingerprints(size_limit_for(file))
+        fresh = fresh_groups(record, file.stem, output_dir, fingerprints)
+        if fresh == set(fingerprints):
+            logger.info(f"Unchanged, skipping: {file}")
+            shutil.move(str(file), str(original_dir / file.name))
+            skipped.append(dict(record["entry"]))
+        else:
+            yield file, sha256, size, fresh, record["entry"] if fresh else None
+
+
+def record_result(cache, sha256, file, entry):
+    """Cache what a processed image produced under its content hash."""
+    cache[sha256] = {
+        "stem": file.stem,
+        "outputs": output_fingerprints(size_limit_for(file)),
+        "entry": dict(entry),
+    }
+
+
+def process_images(
+    input_dir,
+    output_dir,
+    original_dir,
+    mode=DEFAULT_EXECUTOR,
+    workers=None,
+    memory_limit=DEFAULT_MEMORY_MB * 1024 * 1024,
+    manifest_path=None,
+    cache_path=None,
+):
+    """Process all images in the input directory.
+
+    ``mode`` is "thread" or "process". Encoding holds the GIL for much of
+    each image, so processes scale better on several cores. ``cache_path``
+    (default ``original_dir``/optimize-cache.json) records what each input
+    produced, so unchanged inputs are skipped on the next run.
+    """
     input_dir, output_dir, original_dir = map(
         Path, [input_dir, output_dir, original_dir]
     )
+    workers = workers or os.cpu_count() or 1
+    cache_path = Path(cache_path or original_dir / "optimize-cache.json")
+    cache = load_cache(cache_path)
 
-    all_files = list(input_dir.iterdir())
-    image_files = [f for f in all_files if is_image_file(f)]
-    logger.info(f"Found {len(image_files)} image files to process")
+    files = sorted(path for path in input_dir.iterdir() if path.is_file())
+    logger.info(f"Found {len(files)} files, processing with {workers} {mode} workers")
 
-    successful_count = 0
+    skipped = []
+    entries = []
     failed_count = 0
     failed_files = []
+    per_worker = {}
+    started = time.perf_counter()
+
+    tasks = plan_images(files, output_dir, original_dir, cache, skipped)
+    results = run_pool(tasks, output_dir, original_dir, mode, workers, memory_limit)
+    for done, (task, entry, worker, seconds) in enumerate(results, 1):
+        file, sha256 = task[:2]
+        count, busy = per_worker.get(worker, (0, 0.0))
+        per_worker[worker] = (count + 1, busy + seconds)
+        logger.info(f"[{done}] {worker}: {file.name} in {seconds:.1f}s")
+        if entry:
+            entries.append(entry)
+            record_result(cache, sha256, file, entry)
+        else:
+            failed_count += 1
+            failed_files.append(file.name)
 
-    with ThreadPoolExecutor() as executor:
-        future_to_file = {
-            executor.submit(optimize_image, f, output_dir, original_dir): f
-            for f in image_files
-        }
-        for future in as_completed(future_to_file):
-            file = future_to_file[future]
-            try:
-                if future.result():
-                    successful_count += 1
-                else:
-                    failed_count += 1
-                    failed_files.append(file.name)
-            except Exception as exc:
-                logger.error(f"{file} generated an exception: {exc}")
-                failed_count += 1
-                failed_files.append(file.name)
-
-    return successful_count, failed_count, failed_files
+    log_worker_summary(per_worker, time.perf_counter() - started)
+    logger.info(f"{len(skipped)} unchanged images skipped")
+    save_cache(cache_path, cache)
+    entries += skipped
+    if entries:
+        update_manifest(entries, manifest_path)
+    return len(entries), failed_count, failed_files
 
 
 def main():
     """Main function to run the image optimization process."""
-    for dir_path in [INPUT_DIR, OUTPUT_DIR, ORIGINAL_DIR]:
+    env = setup_django()
+    log_file_path = setup_logging(settings.LOG_DIR)
+
+    # Guaranteed logging
+    logger.critical("Script started")
+
+    # Read directory paths from environment variables
+    input_dir = Path(env("INPUT_DIR"))
+    output_dir = Path(env("OUTPUT_DIR"))
+    original_dir = Path(env("ORIGINAL_DIR"))
+
+    print(f"INPUT_DIR: {input_dir}")
+    print(f"OUTPUT_DIR: {output_dir}")
+    print(f"ORIGINAL_DIR: {original_dir}")
+
+    for dir_path in [input_dir, output_dir, original_dir]:
         dir_path.mkdir(parents=True, exist_ok=True)
+    if not output_dir.resolve().is_relative_to(STATIC_DIR.resolve()):
+        logger.error(f"OUTPUT_DIR must be inside {STATIC_DIR} to be served")
+        sys.exit(1)
 
     logger.info("Starting image optimization process")
-    logger.info(f"Input directory: {INPUT_DIR}")
-    logger.info(f"Output directory: {OUTPUT_DIR}")
-    logger.info(f"Original directory: {ORIGINAL_DIR}")
+    logger.info(f"Input directory: {input_dir}")
+    logger.info(f"Output directory: {output_dir}")
+    logger.info(f"Original directory: {original_dir}")
     logger.info(f"Log file: {log_file_path}")
 
+    memory_mb = env.int("OPTIMIZE_MEMORY_MB", default=DEFAULT_MEMORY_MB)
     successful, failed, failed_files = process_images(
-        INPUT_DIR, OUTPUT_DIR, ORIGINAL_DIR
+        input_dir,
+        output_dir,
+        original_dir,
+        mode=env("OPTIMIZE_EXECUTOR", default=DEFAULT_EXECUTOR),
+        workers=env.int("OPTIMIZE_WORKERS", default=0) or None,
+        memory_limit=memory_mb * 1024 * 1024,
+        cache_path=env("OPTIMIZE_CACHE", default=None),
     )
 
     summary = f"Summary: Successfully processed {successful} files, "
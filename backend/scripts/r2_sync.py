@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Sync a local directory to an R2 (or any S3-compatible) prefix by content hash.
+
+The remote side is one list_objects_v2 pass, annotated from a cached
+inventory (key -> SHA-256, ETag and size of what this script uploaded). A
+local file is unchanged when its SHA-256 matches the inventory entry for an
+object whose ETag and size are still the same, or, for objects the inventory
+doesn't know, when its MD5 equals the object's ETag. Only new and changed
+files are uploaded, over parallel connections, with their Content-Type and
+Cache-Control set at upload time. Remote objects without a local file are
+deleted with --delete. Nothing else in the bucket is touched.
+
+Credentials come from the usual AWS variables (AWS_ACCESS_KEY_ID,
+AWS_SECRET_ACCESS_KEY). Point --endpoint at a local S3 stand-in to try it,
+e.g. moto from requirements-dev.txt:
+
+    moto_server -p 5000 &
+    aws --endpoint-url http://localhost:5000 s3 mb s3://test   # or boto3
+
+Usage:
+    python backend/scripts/r2_sync.py static/images --bucket BUCKET \
+        --prefix static/images --endpoint https://ACCOUNT.r2.cloudflarestorage.com \
+        [--delete] [--dry-run] [--workers 16] [--inventory PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif", ".svg"]
+CACHE_CONTROL = "public,max-age=31536000,immutable"
+DELETE_BATCH = 1000
+CHUNK_SIZE = 1024 * 1024
+
+# Not in every Python's default table; S3 would store it as octet-stream.
+mimetypes.add_type("image/avif", ".avif")
+
+
+def file_hashes(path):
+    """(sha256, md5) hex digests of a file."""
+    sha256, md5 = hashlib.sha256(), hashlib.md5(usedforsecurity=False)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def local_files(source, extensions):
+    """{relative key: path} for files under source with a matching extension."""
+    return {
+        path.relative_to(source).as_posix(): path
+        for path in sorted(source.rglob("*"))
+        if path.is_file() and path.suffix.lower() in extensions
+    }
+
+
+def remote_objects(client, bucket, prefix, extensions):
+    """{relative key: {"etag", "size"}} for the objects under prefix."""
+    paginator = client.get_paginator("list_objects_v2")
+    objects = {}
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for entry in page.get("Contents", ()):
+            key = entry["Key"].removeprefix(prefix)
+            if Path(key).suffix.lower() in extensions:
+                objects[key] = {"etag": entry["ETag"].strip('"'), "size": entry["Size"]}
+    return objects
+
+
+def load_inventory(path):
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_inventory(path, inventory):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(inventory, sort_keys=True, indent=1))
+    tmp_path.replace(path)
+
+
+def is_unchanged(remote, cached, sha256, md5, size):
+    if remote is None or remote["size"] != size:
+        return False
+    if cached and cached["etag"] == remote["etag"]:
+        return cached["sha256"] == sha256
+    # Not uploaded by us (or the cache is gone): a single-part upload's
+    # ETag is the MD5 of its content.
+    return remote["etag"] == md5
+
+
+def plan(local, remote, inventory):
+    """Split local files into uploads and unchanged, and find the deletions.
+
+    Returns (uploads, unchanged, deletions, inventory) where uploads is a
+    list of (key, path, sha256) and the inventory only keeps keys that are
+    still in the bucket.
+    """
+    uploads, unchanged = [], []
+    known = {}
+    for key, path in local.items():
+        sha256, md5 = file_hashes(path)
+        size = path.stat().st_size
+        if is_unchanged(remote.get(key), inventory.get(key), sha256, md5, size):
+            unchanged.append(key)
+            known[key] = {"sha256": sha256, **remote[key]}
+        else:
+            uploads.append((key, path, sha256))
+    deletions = sorted(set(remote) - set(local))
+    return uploads, unchanged, deletions, known
+
+
+class Uploader:
+    def __init__(self, client, bucket, prefix, cache_control):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_control = cache_control
+        self.lock = threading.Lock()
+        self.bytes = 0
+
+    def upload(self, key, path):
+        data = path.read_bytes()
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        response = self.client.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}{key}",
+            Body=data,
+            ContentType=content_type,
+            CacheControl=self.cache_control,
+        )
+        with self.lock:
+            self.bytes += len(data)
+        return {"etag": response["ETag"].strip('"'), "size": len(data)}
+
+
+def upload_all(uploader, uploads, workers, inventory):
+    """Upload in parallel; record each success in the inventory."""
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(uploader.upload, key, path): (key, sha256)
+            for key, path, sha256 in uploads
+        }
+        for future in as_completed(futures):
+            key, sha256 = futures[future]
+            try:
+                inventory[key] = {"sha256": sha256, **future.result()}
+                print(f"upload: {key}")
+            except Exception as exc:
+                failures.append(key)
+                print(f"failed: {key}: {exc}", file=sys.stderr)
+    return failures
+
+
+def delete_all(client, bucket, prefix, keys):
+    for start in range(0, len(keys), DELETE_BATCH):
+        batch = keys[start : start + DELETE_BATCH]  # noqa: E203
+        client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": f"{prefix}{key}"} for key in batch]},
+        )
+        for key in batch:
+            print(f"delete: {key}")
+
+
+def default_inventory(bucket, prefix):
+    name = f"{bucket}-{prefix.strip('/').replace('/', '-') or 'root'}.json"
+    return Path.home() / ".cache" / "r2-sync" / name
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", type=Path)
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--prefix", default="", help="Key prefix, e.g. static/images")
+    parser.add_argument("--endpoint", help="S3 endpoint URL (default: AWS)")
+    parser.add_argument("--region", default="auto")
+    parser.add_argument("--extensions", nargs="+", default=IMAGE_EXTENSIONS)
+    parser.add_argument("--cache-control", default=CACHE_CONTROL)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--inventory", type=Path, help="Inventory cache file")
+    parser.add_argument("--delete", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.prefix and not args.prefix.endswith("/"):
+        args.prefix += "/"
+    args.extensions = {ext.lower() for ext in args.extensions}
+    if args.inventory is None:
+        args.inventory = default_inventory(args.bucket, args.prefix)
+    return args
+
+
+def main():
+    args = parse_args()
+    client = boto3.client(
+        "s3",
+        endpoint_url=args.endpoint,
+        region_name=args.region,
+        config=Config(max_pool_connections=args.workers, retries={"mode": "standard"}),
+    )
+
+    started = time.perf_counter()
+    local = local_files(args.source, args.extensions)
+    remote = remote_objects(client, args.bucket, args.prefix, args.extensions)
+    uploads, unchanged, deletions, inventory = plan(
+        local, remote, load_inventory(args.inventory)
+    )
+    if not args.delete:
+        deletions = []
+    planned = time.perf_counter() - started
+    print(
+        f"{len(local)} local, {len(remote)} remote: {len(uploads)} to upload,"
+        f" {len(unchanged)} unchanged, {len(deletions)} to delete"
+        f" (planned in {planned:.2f}s)"
+    )
+    if args.dry_run:
+        for key, _, _ in uploads:
+            print(f"would upload: {key}")
+        for key in deletions:
+            print(f"would delete: {key}")
+        return 0
+
+    uploader = Uploader(client, args.bucket, args.prefix, args.cache_control)
+    transfer_started = time.perf_counter()
+    failures = upload_all(uploader, uploads, args.workers, inventory)
+    delete_all(client, args.bucket, args.prefix, deletions)
+    elapsed = time.perf_counter() - transfer_started
+    save_inventory(args.inventory, inventory)
+
+    uploaded = len(uploads) - len(failures)
+    megabytes = uploader.bytes / 1e6
+    rate = (
+        f"{megabytes / elapsed:.2f} MB/s, {uploaded / elapsed:.1f} files/s"
+        if elapsed
+        else "-"
+    )
+    print(
+        f"Uploaded {uploaded} files ({megabytes:.2f} MB) and deleted {len(deletions)}"
+        f" in {elapsed:.2f}s ({rate}) with {args.workers} connections;"
+        f" {len(failures)} failed"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Queue-based logging handlers.
+
+Request threads only put records on a bounded in-memory queue; a daemon
+thread per handler drains it in batches and does the formatting and I/O.
+Use QueuedHandler in LOGGING with the real handler class as ``target``:
+
+    "file": {
+        "class": "chesley_web.queue_logging.QueuedHandler",
+        "target": "chesley_web.queue_logging.BatchRotatingFileHandler",
+        "filename": "/var/log/chesley_web/django/django.log",
+        "maxBytes": 10 * 1024 * 1024,
+        "backupCount": 5,
+        "formatter": "verbose",
+    }
+"""
+
+import copy
+import fcntl
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import weakref
+
+from django.utils.module_loading import import_string
+
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+# Renders tracebacks for targets that have no formatter of their own.
+DEFAULT_FORMATTER = logging.Formatter()
+
+_handlers = weakref.WeakSet()
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated log file written in batches by a QueuedHandler thread.
+
+    Records are written to the buffered stream and flushed once per batch.
+    Several gunicorn workers can share one file: the size is re-read from
+    disk after every batch, rotation happens under an flock, and a worker
+    whose file was rotated by another one reopens the new file.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._size = 0
+        self._inode = None
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        stream = super()._open()
+        self._inode = os.fstat(stream.fileno()).st_ino
+        self._size = os.fstat(stream.fileno()).st_size
+        return stream
+
+    def _rotated_elsewhere(self):
+        try:
+            return os.stat(self.baseFilename).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def _reopen(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = self._open()
+
+    def _sync(self):
+        """Pick up writes and rotations done by other processes."""
+        if self.stream is None:
+            return
+        if self._rotated_elsewhere():
+            self._reopen()
+        else:
+            self._size = os.fstat(self.stream.fileno()).st_size
+
+    def emit(self, record):
+        # Like RotatingFileHandler.emit, but without its per-record seek(),
+        # which would flush the stream, or its second format() call.
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self._size + len(msg) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(msg)
+            self._size += len(msg)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.flush()
+        with open(f"{self.baseFilename}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self._rotated_elsewhere():
+                self._reopen()
+            else:
+                super().doRollover()
+
+    def flush(self):
+        # StreamHandler.emit() flushes after every record; wait for the batch.
+        pass
+
+    def flush_batch(self):
+        if self.stream and not self.stream.closed:
+            self.stream.flush()
+            self._sync()
+
+    def close(self):
+        with self.lock:
+            self.flush_batch()
+        super().close()
+
+
+class QueuedHandler(logging.Handler):
+    """Enqueue records for a background thread that feeds the target handler.
+
+    Records are dropped (and counted in ``dropped``) rather than blocking the
+    caller when the queue is full. This is a plain Handler that owns its
+    queue and listener thread, not a QueueHandler subclass: from Python 3.12
+    dictConfig() insists that QueueHandler subclasses list ``handlers``.
+    """
+
+    def __init__(self, target, queue_size=QUEUE_SIZE, **kwargs):
+        handler_class = import_string(target) if isinstance(target, str) else target
+        self.target = handler_class(**kwargs)
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._dropped_reported = 0
+        super().__init__()
+        self.queue = queue.Queue(queue_size)
+        self._start()
+        _handlers.add(self)
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-{self.target.__class__.__name__}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        flush = getattr(self.target, "flush_batch", self.target.flush)
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self.target.lock:
+                for record in batch:
+                    if record is None:
+                        flush()
+                        return
+                    self.target.handle(record)
+                self._report_dropped()
+                flush()
+
+    def _report_dropped(self):
+        dropped = self.dropped - self._dropped_reported
+        if dropped:
+            self._dropped_reported += dropped
+            record = logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Log queue full: dropped {dropped} records",
+                }
+            )
+            self.target.handle(record)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the target handler.
+        self.target.setFormatter(fmt)
+
+    def setLevel(self, level):
+        super().setLevel(level)
+        self.target.setLevel(level)
+
+    def prepare(self, record):
+        """A copy of ``record`` that is safe to hand to the listener thread.
+
+        Like QueueHandler.prepare(), the arguments are merged and the
+        traceback and stack are rendered into the message now, while they
+        still hold their current values, so the queue keeps no frames or
+        exception objects alive. The target's formatter still lays out the
+        rest of the line.
+        """
+        formatter = self.target.formatter or DEFAULT_FORMATTER
+        record = copy.copy(record)
+        parts = [record.getMessage()]
+        if record.exc_info:
+            parts.append(formatter.formatException(record.exc_info))
+        elif record.exc_text:
+            parts.append(record.exc_text)
+        if record.stack_info:
+            parts.append(formatter.formatStack(record.stack_info))
+        record.msg = "\n".join(parts)
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        self.target.close()
+        super().close()
+
+    def _before_fork(self):
+        # Wait for the listener to finish its current batch and flush it, so
+        # the child neither inherits a half-written buffer nor writes it twice.
+        self.target.acquire()
+        getattr(self.target, "flush_batch", self.target.flush)()
+
+    def _after_fork_in_parent(self):
+        self.target.release()
+
+    def _after_fork_in_child(self):
+        # The parent's listener thread doesn't exist in the child. The
+        # logging module may already have replaced the held lock, so make
+        # a fresh one rather than releasing it.
+        self.target.createLock()
+        self.queue = queue.Queue(self.queue_size)
+        self._start()
+
+
+def _before_fork():
+    for handler in list(_handlers):
+        handler._before_fork()
+
+
+def _after_fork_in_parent():
+    for handler in list(_handlers):
+        handler._after_fork_in_parent()
+
+
+def _after_fork_in_child():
+    for handler in list(_handlers):
+        handler._after_fork_in_child()
+
+
+os.register_at_fork(
+    before=_before_fork,
+    after_in_parent=_after_fork_in_parent,
+    after_in_child=_after_fork_in_child,
+)
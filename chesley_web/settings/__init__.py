@@ -1,7 +1,8 @@
 import os
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+# No basicConfig() here: it would attach a synchronous root handler at DEBUG
+# before Django applies LOGGING.
 logger = logging.getLogger(__name__)
 
 from .base import *  # noqa: F403
@@ -33,20 +33,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "main.middleware.PageCacheFastPathMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.middleware.ViewTimingMiddleware",
 ]
 
 ROOT_URLCONF = "chesley_web.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "main.timing.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": ["templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -88,9 +92,89 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# main.storage.IncrementalManifestStaticStorage: parallel uploads, and the
+# local cache of what is already in the bucket.
+STATIC_UPLOAD_WORKERS = env.int("STATIC_UPLOAD_WORKERS", default=8)
+STATIC_INVENTORY_FILE = env(
+    "STATIC_INVENTORY_FILE", default=str(BASE_DIR / ".staticfiles-inventory.json")
+)
+# Widths and formats generated by backend/scripts/optimize_images.py, read by
+# the {% responsive_image %} template tag.
+RESPONSIVE_IMAGES_MANIFEST = env(
+    "RESPONSIVE_IMAGES_MANIFEST",
+    default=str(BASE_DIR / "static" / "images" / "responsive.json"),
+)
+
+# /img/<width>/<path>: images under IMAGE_RESIZE_SOURCE_DIR resized on first
+# request and kept in an LRU disk cache of at most IMAGE_RESIZE_CACHE_MB. Only
+# IMAGE_RESIZE_WIDTHS are rendered; other widths redirect to the next one up.
+IMAGE_RESIZE_SOURCE_DIR = env(
+    "IMAGE_RESIZE_SOURCE_DIR", default=str(BASE_DIR / "static" / "images")
+)
+IMAGE_RESIZE_CACHE_DIR = env(
+    "IMAGE_RESIZE_CACHE_DIR", default=str(BASE_DIR / "image-cache")
+)
+IMAGE_RESIZE_CACHE_MB = env.int("IMAGE_RESIZE_CACHE_MB", default=256)
+IMAGE_RESIZE_WIDTHS = env.list(
+    "IMAGE_RESIZE_WIDTHS",
+    cast=int,
+    default=[160, 320, 480, 640, 960, 1200, 1600, 2400],
+)
+
+# Tree timeline photos (main/tree_photos.py), indexed once at startup
+TREE_PHOTOS_DIR = env(
+    "TREE_PHOTOS_DIR", default=str(BASE_DIR / "static" / "images" / "trees")
+)
+
+# Growth log (/growing/log/<plant>/): entries per page, and how long each
+# entry's rendered fragment is cached (it is re-rendered when the entry changes)
+GROWTH_LOG_PAGE_SIZE = env.int("GROWTH_LOG_PAGE_SIZE", default=20)
+GROWTH_LOG_FRAGMENT_TIMEOUT = env.int(
+    "GROWTH_LOG_FRAGMENT_TIMEOUT", default=60 * 60 * 24
+)
 
 CONTACT_EMAIL = env("CONTACT_EMAIL", default="chris@cchesley.com")
 
+# Cache (per worker process)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "chesley-web",
+        "OPTIONS": {"MAX_ENTRIES": 500},
+    },
+    # {% cache %} fragments (the growth log's entries), kept apart so a long
+    # log can't cull rendered pages out of "default"
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "chesley-web-fragments",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+}
+
+# Rendered page cache for the template-only views in main/views.py
+PAGE_CACHE_ENABLED = env.bool("PAGE_CACHE_ENABLED", default=True)
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", default=60 * 60)
+# Answer cookieless anonymous requests from that cache before sessions/auth run
+PAGE_CACHE_FAST_PATH = env.bool("PAGE_CACHE_FAST_PATH", default=True)
+
+# Prebuilt notebook pages (python manage.py build_pages)
+PREBUILT_PAGES_ENABLED = env.bool("PREBUILT_PAGES_ENABLED", default=True)
+PREBUILT_PAGES_DIR = env("PREBUILT_PAGES_DIR", default=str(BASE_DIR / "prebuilt"))
+# Internal nginx location mapped to PREBUILT_PAGES_DIR, e.g. "/_prebuilt/".
+# When set, nginx sends the files via X-Accel-Redirect instead of gunicorn.
+PREBUILT_PAGES_ACCEL_PREFIX = env("PREBUILT_PAGES_ACCEL_PREFIX", default="")
+# Stream the notebook pages in chunks when no prebuilt copy is available
+STREAMING_PAGES_ENABLED = env.bool("STREAMING_PAGES_ENABLED", default=False)
+# Send only the first notebook cells and load the rest in chunks on scroll
+NOTEBOOK_LAZY_CELLS = env.bool("NOTEBOOK_LAZY_CELLS", default=False)
+NOTEBOOK_INITIAL_CELLS = env.int("NOTEBOOK_INITIAL_CELLS", default=15)
+NOTEBOOK_CHUNK_CELLS = env.int("NOTEBOOK_CHUNK_CELLS", default=25)
+
+# Request phase timings (main/middleware.py)
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=True)
+# Bearer token that lets a Prometheus scraper read /metrics/ without a staff login
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -99,7 +183,10 @@ AUTH_USER_MODEL = "main.CustomUser"
 LOGIN_REDIRECT_URL = "homepage"
 LOGOUT_REDIRECT_URL = "homepage"
 
-# Base logging configuration (can be overridden in environment-specific settings)
+# Base logging configuration (can be overridden in environment-specific settings).
+# Handlers go through chesley_web.queue_logging so request threads only enqueue.
+LOG_MAX_BYTES = env.int("LOG_MAX_BYTES", default=10 * 1024 * 1024)
+LOG_BACKUP_COUNT = env.int("LOG_BACKUP_COUNT", default=5)
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -116,13 +203,17 @@ LOGGING = {
     "handlers": {
         "console": {
             "level": "INFO",
-            "class": "logging.StreamHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "logging.StreamHandler",
             "formatter": "simple",
         },
         "file": {
             "level": "DEBUG",
-            "class": "logging.FileHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "chesley_web.queue_logging.BatchRotatingFileHandler",
             "filename": "/var/log/chesley_web/django/django.log",
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
             "formatter": "verbose",
         },
     },
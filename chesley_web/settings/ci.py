@@ -3,6 +3,14 @@ from .base import *
 # CI-specific settings
 DEBUG = False
 
+# The test runner creates its own database; SQLite keeps CI self-contained.
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": env("CI_DB_NAME", default=":memory:"),
+    }
+}
+
 # Use console logging for CI environment
 LOGGING = {
     "version": 1,
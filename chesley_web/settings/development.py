@@ -40,13 +40,17 @@ LOGGING = {
     "handlers": {
         "file": {
             "level": "DEBUG",
-            "class": "logging.FileHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "chesley_web.queue_logging.BatchRotatingFileHandler",
             "filename": LOG_DIR / "debug.log",
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
             "formatter": "verbose",
         },
         "console": {
             "level": "INFO",
-            "class": "logging.StreamHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "logging.StreamHandler",
             "formatter": "simple",
         },
     },
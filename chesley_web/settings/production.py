@@ -29,8 +29,10 @@ R2_ACCESS_KEY_ID = env("R2_ACCESS_KEY_ID")
 R2_SECRET_ACCESS_KEY = env("R2_SECRET_ACCESS_KEY")
 R2_STORAGE_BUCKET_NAME = env("R2_STORAGE_BUCKET_NAME")
 CLOUDFLARE_ACCOUNT_ID = env("CLOUDFLARE_ACCOUNT_ID")
-R2_ENDPOINT_URL = (
-    f"https://{CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com"  # noqa: E231
+# Point at a local S3-compatible server (moto, MinIO) to try collectstatic.
+R2_ENDPOINT_URL = env(
+    "R2_ENDPOINT_URL",
+    default=f"https://{CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com",  # noqa: E231
 )
 
 # AWS/R2 settings
@@ -45,19 +47,13 @@ AWS_QUERYSTRING_AUTH = False
 AWS_S3_FILE_OVERWRITE = True
 AWS_IS_GZIPPED = True
 
-# Enhanced caching configuration for static files
-AWS_S3_OBJECT_PARAMETERS = {
-    "CacheControl": "max-age=31536000",  # Cache for 1 year
-}
-
 # adding static root
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
-# Static files served from Cloudflare R2 with cache busting
-# STATICFILES_STORAGE = "storages.backends.s3boto3.S3ManifestStaticStorage"
-
-# basic collect static files
-STATICFILES_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
+# Static files served from Cloudflare R2 with cache busting: fingerprinted
+# names are cached for a year (immutable), everything else for 5 minutes.
+# Only files whose content changed are uploaded.
+STATICFILES_STORAGE = "main.storage.IncrementalManifestStaticStorage"
 
 # exclude admin files from cache busting
 # STATICFILES_EXCLUDED_APPS = ["admin"]
@@ -84,9 +80,21 @@ DATABASES = {
         "PASSWORD": env("PROD_DB_PASSWORD"),
         "HOST": env("PROD_DB_HOST"),
         "PORT": env("PROD_DB_PORT", default="5432"),
+        # Persistent connections: each gunicorn thread keeps its connection
+        # for up to CONN_MAX_AGE seconds instead of paying a TCP+TLS handshake
+        # to RDS per request. 0 restores one connection per request.
+        "CONN_MAX_AGE": env.int("PROD_DB_CONN_MAX_AGE", default=600),
+        # Ping a reused connection once per request before handing it out.
+        "CONN_HEALTH_CHECKS": env.bool("PROD_DB_CONN_HEALTH_CHECKS", default=True),
         "OPTIONS": {
             "sslmode": "verify-full",
             "sslrootcert": env("DB_SSLROOTCERT"),
+            "connect_timeout": env.int("PROD_DB_CONNECT_TIMEOUT", default=5),
+            # Notice idle connections that RDS or the network dropped.
+            "keepalives": 1,
+            "keepalives_idle": 60,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
         },
     }
 }
@@ -130,15 +138,19 @@ LOGGING = {
     "handlers": {
         "console": {
             "level": "WARNING",
-            "class": "logging.StreamHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "logging.StreamHandler",
             "formatter": "verbose",
         },
         "file": {
             "level": "WARNING",
-            "class": "logging.FileHandler",
+            "class": "chesley_web.queue_logging.QueuedHandler",
+            "target": "chesley_web.queue_logging.BatchRotatingFileHandler",
             "filename": env(
                 "DJANGO_LOG_FILE", default="/var/log/chesley_web/django/django.log"
             ),
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
             "formatter": "verbose",
         },
     },
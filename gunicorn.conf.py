@@ -1,11 +1,158 @@
+import importlib.util
+import math
+import os
+import shutil
+import sys
+import tempfile
+
 bind = "unix:/opt/website/run/gunicorn.sock"
-workers = 3
+wsgi_app = "chesley_web.wsgi:application"
+
+# Where workers record their /metrics/ histograms so any worker can report
+# everyone's (main/timing.py). Set before the workers import prometheus_client;
+# the default is private to this master.
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), f"chesley_web-metrics-{os.getpid()}"),
+)
+
+# Worker model: "sync", "gthread" (threads per worker) or "asgi" (uvicorn
+# workers serving chesley_web.asgi; needs `pip install uvicorn`).
+WORKER_MODE = os.environ.get("GUNICORN_WORKER_MODE", "gthread")
+# RSS of one warmed-up worker in MB. bench_worker_modes.py measured 81 MB
+# for gthread and 65 MB for sync after a 10s run over every route; 90 leaves
+# room for the page cache to fill. Caps workers on small instances.
+WORKER_MEMORY_MB = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", "90"))
+# Memory left for nginx, the OS and everything else on the box.
+RESERVED_MEMORY_MB = int(os.environ.get("GUNICORN_RESERVED_MEMORY_MB", "256"))
+
+
+def available_memory_mb():
+    """Memory this container may use in MB (cgroup limit or MemTotal), or None."""
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            return int(limit) // (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus():
+    """CPUs this container may use: the cgroup CPU quota, else the affinity mask.
+
+    cpu_count() reports the host's CPUs even when the cgroup caps this
+    container at a fraction of them.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def auto_workers(mode, cpus, memory_mb):
+    """CPU-based worker count, capped by how many workers fit in memory."""
+    # Sync workers block on I/O, so they need more processes per core.
+    by_cpu = 2 * cpus + 1 if mode == "sync" else cpus + 1
+    if memory_mb is None:
+        return by_cpu
+    by_memory = (memory_mb - RESERVED_MEMORY_MB) // WORKER_MEMORY_MB
+    return max(1, min(by_cpu, by_memory))
+
+
+if WORKER_MODE not in ("sync", "gthread", "asgi"):
+    raise ValueError(f"Unknown GUNICORN_WORKER_MODE: {WORKER_MODE!r}")
+if WORKER_MODE == "asgi" and importlib.util.find_spec("uvicorn") is None:
+    raise ImportError("GUNICORN_WORKER_MODE=asgi needs uvicorn installed")
+
+workers = int(os.environ.get("GUNICORN_WORKERS", "0"))
+if workers < 1:
+    cpus = available_cpus()
+    workers = auto_workers(WORKER_MODE, cpus, available_memory_mb())
+
+if WORKER_MODE == "gthread":
+    worker_class = "gthread"
+    # Threads keep serving pages while one waits on SMTP or the database.
+    threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+    keepalive = 5
+elif WORKER_MODE == "asgi":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "chesley_web.asgi:application"
+    keepalive = 5
+else:
+    worker_class = "sync"
+    # Sync workers close the connection after each response anyway.
+    keepalive = 2
 
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 timeout = 30
-keepalive = 2
 
 accesslog = "/var/log/chesley_web/django/access.log"
 errorlog = "/var/log/chesley_web/django/error.log"
+
+
+def on_starting(server):
+    """Start the metrics from zero: drop files left by a previous master."""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's histograms, drop its live-gauge files."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid, METRICS_DIR)
+
+
+def pre_fork(server, worker):
+    """Close any database connection the master holds before forking.
+
+    A worker that inherited the socket would share it with the master, and
+    closing it in either process would break it for both. Workers open their
+    own connections lazily per thread.
+    """
+    if "django.db" in sys.modules:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    """Compile the templates before this worker accepts its first request.
+
+    Warm-up is an optimisation: if it fails the worker boots cold instead of
+    crash-looping.
+    """
+    try:
+        from main.warmup import warm_templates
+
+        results = warm_templates()
+    except Exception:
+        worker.log.exception("Template warm-up failed; starting cold")
+        return
+    for name, seconds, status in results:
+        worker.log.info(
+            "Template warm-up: %s %s in %.2f ms", name, status, seconds * 1000
+        )
+    total = sum(seconds for _, seconds, _ in results)
+    worker.log.info(
+        "Template warm-up: %d templates in %.1f ms", len(results), total * 1000
+    )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, Observation, Photo, Plant
 
 
 class CustomUserAdmin(UserAdmin):
@@ -8,4 +8,25 @@ class CustomUserAdmin(UserAdmin):
     list_display = ['username', 'email', 'is_staff', 'is_active']
 
 
+class PlantAdmin(admin.ModelAdmin):
+    list_display = ["name", "kind", "acquired_on"]
+    list_filter = ["kind"]
+    prepopulated_fields = {"slug": ["name"]}
+
+
+class PhotoInline(admin.TabularInline):
+    model = Photo
+    extra = 1
+
+
+class ObservationAdmin(admin.ModelAdmin):
+    list_display = ["plant", "observed_on", "height"]
+    list_filter = ["plant"]
+    list_select_related = ["plant"]
+    date_hierarchy = "observed_on"
+    inlines = [PhotoInline]
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(Plant, PlantAdmin)
+admin.site.register(Observation, ObservationAdmin)
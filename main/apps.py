@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        from .tree_photos import load_photo_index
+
+        load_photo_index()
@@ -0,0 +1,82 @@
+import gzip
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # gzip-only without the Brotli package
+    brotli = None
+
+# Server preference when the client accepts several encodings equally.
+PREFERRED_ENCODINGS = ("br", "gzip")
+# Below this the encoded body isn't worth the extra header bytes.
+MIN_COMPRESS_SIZE = 512
+# (brotli quality, gzip level): offline builds spend more CPU than cache fills.
+BUILD_LEVELS = (11, 9)
+RUNTIME_LEVELS = (5, 6)
+# File suffixes for precompressed variants, as nginx's gzip_static expects.
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def available_encodings():
+    return tuple(e for e in PREFERRED_ENCODINGS if e != "br" or brotli is not None)
+
+
+def compress(content, encoding, levels=RUNTIME_LEVELS):
+    brotli_quality, gzip_level = levels
+    if encoding == "br":
+        return brotli.compress(content, quality=brotli_quality)
+    return gzip.compress(content, compresslevel=gzip_level, mtime=0)
+
+
+def compress_variants(content, levels=RUNTIME_LEVELS):
+    """Return {encoding: body} for each encoding that makes the body smaller."""
+    if len(content) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {}
+    for encoding in available_encodings():
+        compressed = compress(content, encoding, levels)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(request, available):
+    """Pick the best of ``available`` encodings for a request, or None."""
+    accepted = parse_accept_encoding(request.headers.get("Accept-Encoding", ""))
+    best, best_quality = None, 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding not in available:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def set_content_encoding(response, encoding):
+    """Label a response body that is already encoded, and vary on the request."""
+    if encoding:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
@@ -0,0 +1,99 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import Count, Max, Prefetch, Q, prefetch_related_objects
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from .models import Observation, Photo, Plant
+
+# Must match the {% cache %} tag in templates/growing/log/plant.html.
+FRAGMENT_NAME = "growth-log-entry"
+
+
+def encode_cursor(observation):
+    """Opaque ?before= value pointing just past ``observation``."""
+    return f"{observation.observed_on.isoformat()}.{observation.pk}"
+
+
+def decode_cursor(value):
+    """(date, id) from a ?before= value, or 404 for a malformed one."""
+    observed_on, _, pk = value.partition(".")
+    try:
+        return date.fromisoformat(observed_on), int(pk)
+    except ValueError:
+        raise Http404("Bad cursor")
+
+
+def plants():
+    """Every plant with its observation count and latest entry, in one query."""
+    return Plant.objects.annotate(
+        observation_count=Count("observations"),
+        last_observed=Max("observations__observed_on"),
+    )
+
+
+def observation_page(plant, before=None, page_size=None):
+    """(observations, next cursor or None) for one page of a plant's log.
+
+    Keyset pagination on (observed_on, id), newest first: each page is one
+    range scan of observation_plant_date_idx, however far back it is, and
+    entries added meanwhile don't shift later pages. Photos aren't fetched;
+    see prefetch_uncached_photos().
+    """
+    page_size = page_size or settings.GROWTH_LOG_PAGE_SIZE
+    observations = plant.observations.all()
+    if before:
+        observed_on, pk = decode_cursor(before)
+        observations = observations.filter(
+            Q(observed_on__lt=observed_on) | Q(observed_on=observed_on, pk__lt=pk)
+        )
+    # One extra row tells whether there is a next page without a COUNT(*).
+    page = list(observations[: page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, encode_cursor(page[-1])
+
+
+def fragment_key(plant, observation):
+    """Template fragment cache key of one rendered entry.
+
+    It changes when the plant or observation is saved, or one of the
+    observation's photos is saved or deleted (see touch_photo_observation).
+    QuerySet.update() and bulk_create() send no signals and don't set
+    auto_now fields, so after using them on plants, observations or photos,
+    set updated_at too or clear the template_fragments cache.
+    """
+    vary_on = [plant.pk, plant.updated_at, observation.pk, observation.updated_at]
+    return make_template_fragment_key(FRAGMENT_NAME, vary_on)
+
+
+def prefetch_uncached_photos(plant, observations):
+    """Fetch photos, in one query, only for entries not in the fragment cache.
+
+    A page whose entries are all cached costs no photo query. An entry that
+    expires between this check and rendering loads its own photos.
+    """
+    cached = caches["template_fragments"].get_many(
+        [fragment_key(plant, observation) for observation in observations]
+    )
+    misses = [obs for obs in observations if fragment_key(plant, obs) not in cached]
+    prefetch_related_objects(
+        misses, Prefetch("photos", queryset=Photo.objects.order_by("position", "id"))
+    )
+
+
+def plant_log_context(slug, before=None):
+    plant = get_object_or_404(Plant, slug=slug)
+    observations, next_cursor = observation_page(plant, before)
+    prefetch_uncached_photos(plant, observations)
+    return {
+        "plant": plant,
+        "observations": observations,
+        "next_cursor": next_cursor,
+        "is_first_page": not before,
+        "fragment_timeout": settings.GROWTH_LOG_FRAGMENT_TIMEOUT,
+    }
@@ -0,0 +1,240 @@
+import fcntl
+import hashlib
+import io
+import logging
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import redirect
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from .prebuilt import open_immutable, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# extension -> (Pillow format, content type, save options); the output keeps
+# the source's format. Qualities match optimize_images.py's width ladder.
+FORMATS = {
+    ".jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True}),
+    ".jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True}),
+    ".png": ("PNG", "image/png", {"optimize": True}),
+    ".webp": ("WEBP", "image/webp", {"quality": 80}),
+    ".avif": ("AVIF", "image/avif", {"quality": 50}),
+}
+# Concurrent renders of one variant wait on the same lock file.
+LOCK_STRIPES = 64
+# Evict down to this share of the limit so a full cache isn't scanned on
+# every miss.
+EVICT_TO = 0.9
+# Running total of the cache's bytes, shared by every worker; see add_bytes().
+SIZE_FILE = "size"
+# Hits refresh a file's mtime at most this often (seconds), not every request.
+TOUCH_INTERVAL = 60
+# Hex digits of the source's SHA-256 in /img/<width>/<version>/<path> URLs.
+VERSION_LENGTH = 12
+# Part of every cache key; bump it when resize() starts producing different
+# output, so variants rendered the old way aren't served.
+RENDER_REVISION = 2
+# EXIF orientations stored turned by 90 degrees.
+TURNED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class VersionConverter:
+    """URL converter for the source version segment of /img/ URLs."""
+
+    regex = f"[0-9a-f]{{{VERSION_LENGTH}}}"
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+def cache_dir():
+    return Path(settings.IMAGE_RESIZE_CACHE_DIR)
+
+
+def snap_width(width):
+    """The smallest allowed width >= ``width`` (the largest if none is)."""
+    widths = sorted(settings.IMAGE_RESIZE_WIDTHS)
+    return next((w for w in widths if w >= width), widths[-1])
+
+
+def source_path(path):
+    """The file under IMAGE_RESIZE_SOURCE_DIR for a URL path, or 404."""
+    root = Path(settings.IMAGE_RESIZE_SOURCE_DIR).resolve()
+    source = (root / path).resolve()
+    if not source.is_relative_to(root) or source.suffix.lower() not in FORMATS:
+        raise Http404("Unknown image")
+    if not source.is_file():
+        raise Http404("Unknown image")
+    return source
+
+
+@lru_cache(maxsize=1024)
+def content_version(source, mtime_ns, size):
+    with open(source, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:VERSION_LENGTH]
+
+
+def source_version(source):
+    """Short content hash of ``source``, hashed once per process per change."""
+    stat = source.stat()
+    return content_version(source, stat.st_mtime_ns, stat.st_size)
+
+
+def variant_name(source, width):
+    """Cache filename for ``source`` at ``width``; changes when the source does."""
+    stat = source.stat()
+    key = f"{source}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{RENDER_REVISION}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f"{digest}{source.suffix.lower()}"
+
+
+def resize(source, width):
+    """Encode ``source`` scaled down to ``width`` pixels wide (never up).
+
+    The output is turned upright by its EXIF orientation, which it doesn't
+    keep, and ``width`` is the width the image is displayed at.
+    """
+    format, _, options = FORMATS[source.suffix.lower()]
+    with Image.open(source) as img:
+        orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        turned = orientation in TURNED_ORIENTATIONS
+        shown = img.size[::-1] if turned else img.size
+        if width < shown[0]:
+            size = (width, max(1, round(shown[1] * width / shown[0])))
+            # JPEGs decode straight at the nearest DCT scale above the target
+            img.draft(None, size[::-1] if turned else size)
+            img = ImageOps.exif_transpose(img)
+            img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        else:
+            img = ImageOps.exif_transpose(img)
+        if format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def cache_size(directory):
+    """(total bytes, [(mtime, size, path), ...]) of the cached variants."""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return sum(size for _, size, _ in entries), entries
+
+
+def evict(directory, limit):
+    """Delete least recently used variants until the cache is under ``limit``.
+
+    Hits touch their file's mtime, so mtime order is LRU order. Another
+    worker may delete the same file first; that's fine. Returns the bytes
+    left in the cache.
+    """
+    total, entries = cache_size(directory)
+    if total <= limit:
+        return total
+    for _, size, path in sorted(entries):
+        if total <= limit * EVICT_TO:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def add_bytes(directory, written):
+    """Count a newly written variant, evicting when over budget.
+
+    The running total lives in a small file under .locks/, so the cache
+    directory is only scanned when the total passes IMAGE_RESIZE_CACHE_MB
+    (or on the first render, to seed it) instead of after every render.
+    Files deleted behind its back only make it over-count, which triggers
+    a scan that corrects it.
+    """
+    limit = settings.IMAGE_RESIZE_CACHE_MB * 1024 * 1024
+    with open(directory / ".locks" / SIZE_FILE, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        text = f.read().strip()
+        total = int(text) + written if text.isdigit() else limit + 1
+        if total > limit:
+            total = evict(directory, limit)
+        f.seek(0)
+        f.truncate()
+        f.write(str(total))
+
+
+def touch(path):
+    """Mark a cached variant as used; False if it isn't cached."""
+    try:
+        if time.time() - path.stat().st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def cached_variant(source, width):
+    """Path of the cached variant, rendering it first on a miss.
+
+    Only one thread or process renders a given variant: the others block
+    on its lock file and find the finished file when they get the lock.
+    """
+    directory = cache_dir()
+    path = directory / variant_name(source, width)
+    if touch(path):
+        return path
+
+    lock_dir = directory / ".locks"
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    stripe = int(path.stem[:8], 16) % LOCK_STRIPES
+    with open(lock_dir / f"{stripe}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if touch(path):
+            return path
+        try:
+            data = resize(source, width)
+        except (OSError, UnidentifiedImageError, ValueError) as exc:
+            logger.warning(f"Could not resize {source} to {width}px: {exc}")
+            raise Http404("Unknown image")
+        write_atomic(path, data)
+    add_bytes(directory, len(data))
+    return path
+
+
+def serve_resized(request, width, path, version=None):
+    """Serve a static/images file scaled to ``width``, from the disk cache.
+
+    Only IMAGE_RESIZE_WIDTHS are rendered, so each image has a handful of
+    variants however many widths are requested. Responses are immutable,
+    so they are only served at /img/<width>/<version>/<path>, where
+    ``version`` is the source's current content hash. Without a version, or
+    with an old one, the URL can point at different bytes over time: it gets
+    an uncached redirect to the current versioned URL. Any other width gets
+    a permanent redirect to the next allowed one up.
+    """
+    source = source_path(path)
+    allowed = snap_width(width)
+    current = source_version(source)
+    if version != current:
+        response = redirect("resized_image", width=allowed, version=current, path=path)
+        response["Cache-Control"] = "no-cache"
+        return response
+    if allowed != width:
+        return redirect(
+            "resized_image", width=allowed, version=version, path=path, permanent=True
+        )
+    content_type = FORMATS[source.suffix.lower()][1]
+    return open_immutable(cached_variant(source, width), content_type)
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.prebuilt import PREBUILT_PAGES, build_pages, prebuilt_dir
+
+
+class Command(BaseCommand):
+    help = "Render the notebook export pages into immutable prebuilt files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "templates",
+            nargs="*",
+            help="Template names to build (default: all prebuilt pages).",
+        )
+        parser.add_argument(
+            "--output-dir",
+            help="Directory to write to (default: settings.PREBUILT_PAGES_DIR).",
+        )
+        parser.add_argument(
+            "--keep-inline-images",
+            action="store_true",
+            help="Leave base64 images inline instead of extracting them to files.",
+        )
+        parser.add_argument(
+            "--webp",
+            action="store_true",
+            help="Re-encode extracted images to lossless WebP when smaller.",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options["output_dir"] or prebuilt_dir()
+        started = time.perf_counter()
+        pages = build_pages(
+            options["templates"] or PREBUILT_PAGES,
+            output_dir,
+            extract=not options["keep_inline_images"],
+            webp=options["webp"],
+        )
+        for name, entry in pages.items():
+            self.stdout.write(f"{name} -> {entry['file']} ({entry['size']:,} bytes)")
+            images = entry["images"]
+            if images:
+                self.stdout.write(
+                    f"  {images['images']} images extracted, "
+                    f"HTML {images['html_bytes_before']:,} -> "
+                    f"{images['html_bytes_after']:,} bytes, "
+                    f"images {images['image_bytes']:,} bytes, "
+                    f"saved {images['bytes_saved']:,} bytes"
+                )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built {len(pages)} pages into {output_dir} in {elapsed:.2f}s"
+            )
+        )
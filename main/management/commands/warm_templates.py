@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = "Compile every project template and report how long each one took."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "templates",
+            nargs="*",
+            help="Template names to compile (default: everything under templates/).",
+        )
+
+    def handle(self, *args, **options):
+        results = warm_templates(options["templates"])
+        for name, seconds, status in sorted(results, key=lambda r: -r[1]):
+            self.stdout.write(f"{seconds * 1000:9.2f} ms  {status:<9} {name}")
+        total = sum(seconds for _, seconds, _ in results)
+        self.stdout.write(
+            self.style.SUCCESS(f"Warmed {len(results)} templates in {total:.2f}s")
+        )
@@ -0,0 +1,90 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import resolve
+
+from .page_cache import fast_path_response
+from .timing import RequestTimings, current_timings, histograms
+
+
+class ServerTimingMiddleware:
+    """Time each request and report the phases in a Server-Timing header.
+
+    Goes first in MIDDLEWARE, paired with ViewTimingMiddleware last. Query
+    time comes from a database execute wrapper and template time from
+    main.timing.TimedDjangoTemplates. Streamed bodies are rendered after the
+    response leaves this middleware and aren't included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    wrapper = connections[alias].execute_wrapper
+                    stack.enter_context(wrapper(timings.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        timings.finish()
+
+        match = getattr(request, "resolver_match", None)
+        histograms.observe(match.view_name if match else "<unmatched>", timings)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.header()
+        return response
+
+
+class ViewTimingMiddleware:
+    """Mark URL resolution and view boundaries for ServerTimingMiddleware.
+
+    Must be the last entry in MIDDLEWARE so its process_view runs right
+    before the view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = current_timings.get()
+        if timings is None:
+            return self.get_response(request)
+        timings.inner_started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            timings.inner_finished = time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+        return None
+
+
+class PageCacheFastPathMiddleware:
+    """Serve cached pages to cookieless visitors before sessions and auth run.
+
+    Sits right after SecurityMiddleware. Requests with a session or message
+    cookie, and pages that aren't in the cache yet, carry on down the chain
+    unchanged, so logged-in behaviour is the same as without it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = fast_path_response(request)
+        if response is None:
+            return self.get_response(request)
+        # What the skipped CommonMiddleware and XFrameOptionsMiddleware add.
+        request.resolver_match = resolve(request.path_info)
+        response.headers.setdefault("Content-Length", str(len(response.content)))
+        response.headers.setdefault("X-Frame-Options", settings.X_FRAME_OPTIONS)
+        return response
@@ -0,0 +1,125 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Plant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("slug", models.SlugField(max_length=100, unique=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("tree", "Tree"), ("succulent", "Succulent")],
+                        max_length=20,
+                    ),
+                ),
+                ("description", models.TextField(blank=True)),
+                ("acquired_on", models.DateField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["kind", "name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Observation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("observed_on", models.DateField()),
+                (
+                    "height",
+                    models.FloatField(
+                        blank=True, help_text="Height in centimeters", null=True
+                    ),
+                ),
+                ("notes", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "plant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="observations",
+                        to="main.plant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-observed_on", "-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Photo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image",
+                    models.CharField(
+                        help_text="Static path, e.g. images/trees/fig-24-7-28.jpg",
+                        max_length=255,
+                    ),
+                ),
+                ("caption", models.CharField(blank=True, max_length=255)),
+                ("position", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "observation",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="photos",
+                        to="main.observation",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["observation", "position", "id"],
+                        name="photo_observation_pos_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="observation",
+            index=models.Index(
+                fields=["plant", "-observed_on", "-id"],
+                name="observation_plant_date_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 class CustomUser(AbstractUser):
@@ -37,3 +40,89 @@ class CustomUser(AbstractUser):
         if self.height and self.weight:
             return self.weight / ((self.height / 100) ** 2)
         return None
+
+
+class Plant(models.Model):
+    """A tree or succulent with a growth log at /growing/log/<slug>/."""
+
+    KIND_CHOICES = [("tree", "Tree"), ("succulent", "Succulent")]
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    description = models.TextField(blank=True)
+    acquired_on = models.DateField(null=True, blank=True)
+    # Part of every entry's fragment cache key: the entries render its name.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["kind", "name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Observation(models.Model):
+    """A dated entry in a plant's growth log."""
+
+    # The composite index below leads with plant, so the FK needs no index of
+    # its own.
+    plant = models.ForeignKey(
+        Plant, on_delete=models.CASCADE, related_name="observations", db_index=False
+    )
+    observed_on = models.DateField()
+    height = models.FloatField(null=True, blank=True, help_text="Height in centimeters")
+    notes = models.TextField(blank=True)
+    # Part of the entry's template fragment cache key; Photo bumps it too.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-observed_on", "-id"]
+        indexes = [
+            # Serves a plant's log newest first and its keyset pagination
+            models.Index(
+                fields=["plant", "-observed_on", "-id"],
+                name="observation_plant_date_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.plant} - {self.observed_on}"
+
+
+class Photo(models.Model):
+    """A photo attached to an observation, stored under static/."""
+
+    observation = models.ForeignKey(
+        Observation, on_delete=models.CASCADE, related_name="photos", db_index=False
+    )
+    image = models.CharField(
+        max_length=255,
+        help_text="Static path, e.g. images/trees/fig-24-7-28.jpg",
+    )
+    caption = models.CharField(max_length=255, blank=True)
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(
+                fields=["observation", "position", "id"],
+                name="photo_observation_pos_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.image
+
+
+@receiver([post_save, post_delete], sender=Photo)
+def touch_photo_observation(sender, instance, **kwargs):
+    """Expire the cached fragment of the observation a photo is on.
+
+    A signal rather than save()/delete() overrides, so QuerySet.delete(),
+    which sends post_delete for each photo, is covered too.
+    """
+    Observation.objects.filter(pk=instance.observation_id).update(
+        updated_at=timezone.now()
+    )
@@ -0,0 +1,54 @@
+import re
+
+from django.template.loader import render_to_string
+
+# Top-level nbconvert (JupyterLab template) cells; wrappers inside a cell use
+# classes like "jp-Cell-inputWrapper" and don't match.
+CELL_START = re.compile(r'<div class="jp-Cell jp-')
+LAZY_CELLS_TEMPLATE = "learning/pgp_aiml/partials/lazy_cells.html"
+
+
+def split_cells(html):
+    """Split an nbconvert export into (head, cells, tail).
+
+    ``head`` runs up to the first cell inside <main>, ``tail`` from </main> to
+    the end. Returns None for documents that aren't JupyterLab exports.
+    """
+    main_start = html.find("<main>")
+    main_end = html.rfind("</main>")
+    if main_start == -1 or main_end == -1:
+        return None
+    body_start = main_start + len("<main>")
+    offsets = [m.start() for m in CELL_START.finditer(html, body_start, main_end)]
+    if not offsets:
+        return None
+    bounds = zip(offsets, offsets[1:] + [main_end])
+    cells = [html[start:end] for start, end in bounds]
+    first = offsets[0]
+    return html[:first], cells, html[main_end:]
+
+
+def build_lazy_page(html, initial_cells, chunk_cells, write_chunk):
+    """Cut a notebook into an inline first part plus cell chunks.
+
+    ``write_chunk(content)`` stores one chunk and returns its URL. Returns the
+    lazy page HTML and the cell index, or (None, None) when the notebook is
+    too short to be worth splitting.
+    """
+    parts = split_cells(html)
+    if parts is None or len(parts[1]) <= initial_cells:
+        return None, None
+    head, cells, tail = parts
+
+    chunks = []
+    for start in range(initial_cells, len(cells), chunk_cells):
+        end = min(start + chunk_cells, len(cells))
+        url = write_chunk("".join(cells[start:end]).encode("utf-8"))
+        chunks.append({"start": start, "end": end, "url": url})
+
+    loader = render_to_string(
+        LAZY_CELLS_TEMPLATE, {"chunks": [c["url"] for c in chunks]}
+    )
+    page = head + "".join(cells[:initial_cells]) + loader + tail
+    index = {"count": len(cells), "initial": initial_cells, "chunks": chunks}
+    return page, index
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import threading
+
+# <img> tags whose src is an inline base64 image (matplotlib/seaborn output).
+IMG_TAG = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+DATA_SRC = re.compile(
+    r'src="data:image/(?P<type>png|jpeg|gif|webp);base64,(?P<data>[A-Za-z0-9+/=\s]+)"'
+)
+EXTENSIONS = {"png": "png", "jpeg": "jpg", "gif": "gif", "webp": "webp"}
+
+
+def write_atomic(path, data):
+    """Write ``data`` to ``path`` via a temp file in the same directory.
+
+    Readers (and the immutable cache headers in front of them) never see a
+    partly written file, even if the writer is interrupted or races another.
+    The temp name is unique per process and thread; unlike mkstemp() it keeps
+    the umask's permissions, which nginx needs for X-Accel-Redirect.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def to_webp(data):
+    """Losslessly re-encode an image as WebP, or return None if Pillow can't."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            buffer = io.BytesIO()
+            img.save(buffer, "WEBP", lossless=True, method=6)
+    except (OSError, ValueError):
+        return None
+    return buffer.getvalue()
+
+
+def extract_images(html, asset_dir, url_for, webp=False):
+    """Move inline base64 <img> data into content-addressed files.
+
+    Each image is written to ``asset_dir`` as ``<sha256[:16]>.<ext>`` and the
+    tag is rewritten to point at ``url_for(filename)`` with lazy loading. With
+    ``webp=True`` images are re-encoded to lossless WebP when that is smaller.
+    Returns the rewritten HTML, the asset filenames used and byte counts.
+    """
+    asset_dir.mkdir(parents=True, exist_ok=True)
+    assets = []
+    stats = {"images": 0, "image_bytes": 0}
+
+    def replace(match):
+        tag = match.group(0)
+        src = DATA_SRC.search(tag)
+        if src is None:
+            return tag
+        try:
+            data = base64.b64decode(re.sub(r"\s+", "", src.group("data")))
+        except binascii.Error:
+            return tag
+
+        extension = EXTENSIONS[src.group("type")]
+        if webp and extension != "webp":
+            encoded = to_webp(data)
+            if encoded is not None and len(encoded) < len(data):
+                data, extension = encoded, "webp"
+
+        filename = f"{hashlib.sha256(data).hexdigest()[:16]}.{extension}"
+        path = asset_dir / filename
+        if not path.exists():
+            write_atomic(path, data)
+        if filename not in assets:
+            assets.append(filename)
+            stats["image_bytes"] += len(data)
+        stats["images"] += 1
+
+        tag = f'{tag[:src.start()]}src="{url_for(filename)}"{tag[src.end():]}'
+        if "loading=" not in tag:
+            tag = tag.replace("<img", '<img loading="lazy"', 1)
+        return tag
+
+    rewritten = IMG_TAG.sub(replace, html)
+    stats["html_bytes_before"] = len(html.encode("utf-8"))
+    stats["html_bytes_after"] = len(rewritten.encode("utf-8"))
+    # Bytes a first visit no longer downloads (base64 overhead); repeat visits
+    # save the image bytes as well since the files are cached separately.
+    stats["bytes_saved"] = (
+        stats["html_bytes_before"] - stats["html_bytes_after"] - stats["image_bytes"]
+    )
+    return rewritten, assets, stats
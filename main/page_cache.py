@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import re
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.template import engines
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from .compression import compress_variants, negotiate_encoding, set_content_encoding
+from .responsive_images import manifest_digest
+
+# {% extends "x" %} / {% include "x" %} with a literal template name.
+TEMPLATE_REFERENCE = re.compile(r"""{%\s*(?:extends|include)\s+["']([^"']+)["']""")
+
+# path -> (template name, context) of pages cookieless visitors can get
+# straight from the cache; see fast_path_response().
+FAST_PATH_PREFIX = "page-path:"
+# page key + this -> the encodings the cached page has variants for, so a
+# conditional request can pick its ETag without loading the page.
+ENCODINGS_SUFFIX = ":encodings"
+
+# template name -> resolved path, and path -> ((mtime_ns, size), file info)
+_template_paths = {}
+_file_info = {}
+
+
+def template_path(template_name):
+    """Return the file a template name resolves to, or None if not on disk."""
+    if template_name not in _template_paths:
+        path = None
+        for loader in engines["django"].engine.template_loaders:
+            for origin in loader.get_template_sources(template_name):
+                if os.path.isfile(origin.name):
+                    path = origin.name
+                    break
+            if path:
+                break
+        _template_paths[template_name] = path
+    return _template_paths[template_name]
+
+
+def file_info(path):
+    """Digest, mtime and template references of a file.
+
+    Only re-read when the file's mtime or size changes, so calling this on
+    every request costs one stat().
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_info.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as f:
+        data = f.read()
+    info = {
+        "digest": hashlib.sha256(data).hexdigest(),
+        "mtime": stat.st_mtime,
+        "references": TEMPLATE_REFERENCE.findall(data.decode("utf-8", "replace")),
+    }
+    _file_info[path] = (signature, info)
+    return info
+
+
+def file_digest(path):
+    """SHA-256 of a file, re-hashed only when its mtime or size changes."""
+    return file_info(path)["digest"]
+
+
+def template_dependencies(template_name):
+    """Paths of a template and everything it extends or includes, recursively."""
+    paths, pending, seen = [], [template_name], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        path = template_path(name)
+        if path is None:
+            continue
+        paths.append(path)
+        pending.extend(file_info(path)["references"])
+    return paths
+
+
+def template_fingerprint(template_name):
+    """Hash covering a template and its {% extends %}/{% include %} chain."""
+    digests = [file_digest(path) for path in template_dependencies(template_name)]
+    if len(digests) <= 1:
+        return digests[0] if digests else ""
+    return hashlib.sha256("|".join(digests).encode()).hexdigest()
+
+
+def template_last_modified(template_name):
+    """Latest mtime across a template's dependency chain, or None."""
+    mtimes = [file_info(path)["mtime"] for path in template_dependencies(template_name)]
+    return max(mtimes) if mtimes else None
+
+
+def asset_version():
+    """Identifies the asset URLs a page renders with.
+
+    {% static %} URLs come from the staticfiles manifest (hashed names in
+    production) and {% responsive_image %} srcsets from responsive.json, so
+    a new collectstatic or image build changes the page without touching
+    its template.
+    """
+    static_manifest = getattr(staticfiles_storage, "manifest_hash", "")
+    return f"{static_manifest}|{manifest_digest()}"
+
+
+def page_cache_key(template_name, context=None):
+    payload = json.dumps(context or {}, sort_keys=True, default=str)
+    fingerprint = template_fingerprint(template_name)
+    release = getattr(settings, "VERSION", "")
+    assets = asset_version()
+    raw = f"{template_name}|anonymous|{payload}|{fingerprint}|{release}|{assets}"
+    return "page:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def page_etag(digest, encoding):
+    """Strong ETag for one encoding of a page; each coding is its own entity."""
+    return f'"{digest[:32]}-{encoding or "identity"}"'
+
+
+def is_page_cacheable(request):
+    """Only anonymous GET/HEAD requests with no pending messages share a page."""
+    if not settings.PAGE_CACHE_ENABLED or request.method not in ("GET", "HEAD"):
+        return False
+    return not request.user.is_authenticated and not len(get_messages(request))
+
+
+def set_validators(response, etag, last_modified):
+    """Attach ETag/Last-Modified and ask clients to revalidate on every use."""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified_response(request, etag, last_modified):
+    """A 304 (or 412) for a matching conditional request, else None."""
+    if last_modified is not None:
+        last_modified = int(last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def is_cookieless(request):
+    """No session or message cookie: the visitor can only be anonymous."""
+    cookies = request.COOKIES
+    return settings.SESSION_COOKIE_NAME not in cookies and "messages" not in cookies
+
+
+def served_etag(request, key, encodings):
+    """(encoding, ETag) of the variant a request gets, from those a page has.
+
+    Pages below MIN_COMPRESS_SIZE have no variants, so they are served, and
+    tagged, as identity whatever the client accepts.
+    """
+    encoding = negotiate_encoding(request, encodings)
+    return encoding, page_etag(key.partition(":")[2], encoding)
+
+
+def page_not_modified(request, key, last_modified):
+    """A 304 for a page whose encodings are cached, without loading the page."""
+    encodings = cache.get(key + ENCODINGS_SUFFIX)
+    if encodings is None:
+        return None
+    _, etag = served_etag(request, key, encodings)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        patch_vary_headers(response, ("Accept-Encoding", "Cookie"))
+    return response
+
+
+def store_page(key, page):
+    encodings = tuple(page["variants"])
+    cache.set_many(
+        {key: page, key + ENCODINGS_SUFFIX: encodings}, settings.PAGE_CACHE_TIMEOUT
+    )
+
+
+def cached_page_response(request, key, page, last_modified):
+    """The variant of a cached page the request accepts, or a 304 for it."""
+    encoding, etag = served_etag(request, key, page["variants"])
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        patch_vary_headers(response, ("Accept-Encoding", "Cookie"))
+        return response
+    content = page["variants"][encoding] if encoding else page["content"]
+    response = HttpResponse(content, content_type=page["content_type"])
+    set_content_encoding(response, encoding)
+    set_validators(response, etag, last_modified)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def fast_path_response(request):
+    """Answer a cookieless anonymous GET from the page cache, or return None.
+
+    render_cached() records which template and context each path rendered
+    for a cookieless visitor. Later cookieless requests for that path are
+    answered here, before the session, auth and message machinery or the
+    URL resolver and view run. The key still goes through page_cache_key(),
+    so a template edit invalidates the fast path like the cache itself.
+    """
+    if not settings.PAGE_CACHE_FAST_PATH or request.method not in ("GET", "HEAD"):
+        return None
+    if not settings.PAGE_CACHE_ENABLED or not is_cookieless(request):
+        return None
+    route = cache.get(FAST_PATH_PREFIX + request.path_info)
+    if route is None:
+        return None
+    template_name, context = route
+    key = page_cache_key(template_name, context)
+    last_modified = template_last_modified(template_name)
+    response = page_not_modified(request, key, last_modified)
+    if response is not None:
+        return response
+    page = cache.get(key)
+    if page is None:
+        return None
+    return cached_page_response(request, key, page, last_modified)
+
+
+def render_cached(request, template_name, context=None):
+    """Drop-in for render() on views whose output depends only on auth state.
+
+    Authenticated users get the page rendered as usual (it carries their
+    username and a CSRF token). Anonymous users share one rendered copy per
+    template and context, which is dropped as soon as the template file changes.
+    The copy is stored with its gzip/Brotli variants, compressed once per fill.
+
+    Anonymous responses carry an ETag and Last-Modified derived from the
+    template chain and the encoding served. Matching conditional requests
+    get a 304 from the page's list of encodings, without loading or
+    rendering the page itself.
+    """
+    if not is_page_cacheable(request):
+        return render(request, template_name, context)
+
+    key = page_cache_key(template_name, context)
+    last_modified = template_last_modified(template_name)
+    response = page_not_modified(request, key, last_modified)
+    if response is not None:
+        return response
+
+    page = cache.get(key)
+    if page is None:
+        response = render(request, template_name, context)
+        # A page that handed out a CSRF token is tied to this visitor.
+        if request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        page = {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "variants": compress_variants(response.content),
+        }
+        store_page(key, page)
+
+    if is_cookieless(request):
+        route = (template_name, context)
+        cache.set(
+            FAST_PATH_PREFIX + request.path_info, route, settings.PAGE_CACHE_TIMEOUT
+        )
+    return cached_page_response(request, key, page, last_modified)
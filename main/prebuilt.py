@@ -0,0 +1,286 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .compression import (
+    BUILD_LEVELS,
+    ENCODING_SUFFIXES,
+    compress_variants,
+    negotiate_encoding,
+    set_content_encoding,
+)
+from .notebook_cells import build_lazy_page
+from .notebook_images import extract_images, write_atomic
+from .page_cache import (
+    not_modified_response,
+    page_etag,
+    render_cached,
+    set_validators,
+    template_fingerprint,
+    template_last_modified,
+)
+from .streaming import render_streaming
+
+# Jupyter HTML exports: standalone documents with no per-request data.
+PREBUILT_PAGES = [
+    "learning/pgp_aiml/project1.html",
+    "learning/pgp_aiml/project2.html",
+    "learning/pgp_aiml/project3.html",
+    "learning/pgp_aiml/project4.html",
+    "learning/pgp_aiml/project5.html",
+    "learning/pgp_aiml/project6.html",
+]
+
+MANIFEST_NAME = "manifest.json"
+ASSETS_DIR_NAME = "assets"
+CELLS_DIR_NAME = "cells"
+CONTENT_TYPE = "text/html; charset=utf-8"
+ASSET_NAME = re.compile(r"^[0-9a-f]{16}\.(png|jpg|gif|webp)$")
+CELLS_NAME = re.compile(r"^[0-9a-f]{16}\.html$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_manifest = {"signature": None, "pages": {}}
+
+
+def prebuilt_dir():
+    return Path(settings.PREBUILT_PAGES_DIR)
+
+
+def asset_url(filename):
+    return reverse("prebuilt_asset", args=[filename])
+
+
+def write_html(path, content):
+    """Write an HTML file plus its .br/.gz variants; return the encodings."""
+    if not path.exists():
+        write_atomic(path, content)
+    encodings = []
+    for encoding, body in compress_variants(content, BUILD_LEVELS).items():
+        write_atomic(path.with_name(path.name + ENCODING_SUFFIXES[encoding]), body)
+        encodings.append(encoding)
+    return encodings
+
+
+def write_cells_chunk(output_dir, content):
+    filename = f"{hashlib.sha256(content).hexdigest()[:16]}.html"
+    cells_dir = output_dir / CELLS_DIR_NAME
+    cells_dir.mkdir(parents=True, exist_ok=True)
+    write_html(cells_dir / filename, content)
+    return reverse("notebook_cells", args=[filename])
+
+
+def build_lazy(html, stem, output_dir):
+    """Write the lazy-loading variant of a notebook page, if it has one."""
+    page, index = build_lazy_page(
+        html,
+        settings.NOTEBOOK_INITIAL_CELLS,
+        settings.NOTEBOOK_CHUNK_CELLS,
+        lambda content: write_cells_chunk(output_dir, content),
+    )
+    if page is None:
+        return None
+    content = page.encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    filename = f"{stem}.{digest[:12]}.html"
+    index.update(
+        file=filename,
+        encodings=write_html(output_dir / filename, content),
+        sha256=digest,
+        size=len(content),
+    )
+    return index
+
+
+def build_page(template_name, output_dir, extract=True, webp=False):
+    """Render a template once and store it under a content-addressed name.
+
+    With ``extract`` the inline base64 images are moved out into
+    ``<output_dir>/assets`` and referenced by URL instead. Brotli and gzip
+    variants are written alongside as ``<file>.br`` and ``<file>.gz``.
+    Notebooks also get a lazy variant whose later cells load in chunks.
+    """
+    html = render_to_string(template_name)
+    assets, images = [], None
+    if extract:
+        html, assets, images = extract_images(
+            html, output_dir / ASSETS_DIR_NAME, asset_url, webp=webp
+        )
+    content = html.encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    stem = Path(template_name).stem
+    filename = f"{stem}.{digest[:12]}.html"
+    return {
+        "file": filename,
+        "encodings": write_html(output_dir / filename, content),
+        "source": template_fingerprint(template_name),
+        "sha256": digest,
+        "size": len(content),
+        "assets": assets,
+        "images": images,
+        "cells": build_lazy(html, stem, output_dir),
+    }
+
+
+def build_pages(template_names=None, output_dir=None, extract=True, webp=False):
+    """Build every prebuilt page and write the manifest the views read."""
+    output_dir = Path(output_dir or prebuilt_dir())
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    pages = {}
+    if manifest_path.exists():
+        pages = json.loads(manifest_path.read_text())["pages"]
+
+    built = {
+        name: build_page(name, output_dir, extract=extract, webp=webp)
+        for name in template_names or PREBUILT_PAGES
+    }
+    pages.update(built)
+    manifest = json.dumps({"pages": pages}, indent=2, sort_keys=True)
+    write_atomic(manifest_path, manifest.encode("utf-8"))
+
+    prune(output_dir, pages.values())
+    return built
+
+
+def prune(output_dir, entries):
+    """Drop superseded builds; live files are only ever replaced, never edited."""
+    live, live_assets, live_cells = set(), set(), set()
+    for entry in entries:
+        live.add(entry["file"])
+        live_assets.update(entry.get("assets", []))
+        if entry.get("cells"):
+            live.add(entry["cells"]["file"])
+            live_cells.update(
+                chunk["url"].rsplit("/", 1)[1] for chunk in entry["cells"]["chunks"]
+            )
+    suffixes = tuple(ENCODING_SUFFIXES.values())
+    for directory, names in [
+        (output_dir, live | {MANIFEST_NAME}),
+        (output_dir / ASSETS_DIR_NAME, live_assets),
+        (output_dir / CELLS_DIR_NAME, live_cells),
+    ]:
+        for path in directory.glob("*"):
+            name = path.name
+            if name.endswith(suffixes):
+                name = name.rsplit(".", 1)[0]
+            if path.is_file() and name not in names:
+                path.unlink()
+
+
+def load_manifest():
+    """Return the prebuilt page entries, re-reading the manifest when it changes."""
+    path = prebuilt_dir() / MANIFEST_NAME
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return {}
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _manifest["signature"] != signature:
+        with open(path) as f:
+            _manifest["pages"] = json.load(f)["pages"]
+        _manifest["signature"] = signature
+    return _manifest["pages"]
+
+
+def prebuilt_entry(template_name):
+    """Manifest entry for a template, or None if missing or out of date."""
+    if not settings.PREBUILT_PAGES_ENABLED:
+        return None
+    entry = load_manifest().get(template_name)
+    if entry is None or entry["source"] != template_fingerprint(template_name):
+        return None
+    return entry
+
+
+def prebuilt_response(request, template_name):
+    entry = prebuilt_entry(template_name)
+    if entry is None:
+        return None
+    # In lazy mode notebooks ship their first cells only; ?full=1 opts out.
+    cells = entry.get("cells")
+    if cells and settings.NOTEBOOK_LAZY_CELLS and "full" not in request.GET:
+        entry = cells
+
+    if settings.PREBUILT_PAGES_ACCEL_PREFIX:
+        # Let nginx send the file straight from disk; gzip_static/brotli_static
+        # on that location pick the precompressed variant and add validators.
+        response = HttpResponse(content_type=CONTENT_TYPE)
+        response["X-Accel-Redirect"] = (
+            settings.PREBUILT_PAGES_ACCEL_PREFIX + entry["file"]
+        )
+        return response
+
+    encoding = negotiate_encoding(request, entry.get("encodings", []))
+    etag = page_etag(entry["sha256"], encoding)
+    last_modified = template_last_modified(template_name)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return set_content_encoding(response, None)
+
+    filename = entry["file"] + (ENCODING_SUFFIXES[encoding] if encoding else "")
+    try:
+        f = open(prebuilt_dir() / filename, "rb")
+    except FileNotFoundError:
+        return None
+    # gunicorn hands the file object to sendfile() via wsgi.file_wrapper.
+    response = FileResponse(f, content_type=CONTENT_TYPE)
+    response.block_size = 64 * 1024
+    del response["Content-Disposition"]
+    set_validators(response, etag, last_modified)
+    return set_content_encoding(response, encoding)
+
+
+def open_immutable(path, content_type=None):
+    """FileResponse for a content-addressed file, or 404 if it's missing."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        raise Http404("Unknown file")
+    response = FileResponse(f, content_type=content_type)
+    del response["Content-Disposition"]
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def serve_asset(request, name):
+    """Serve an image extracted from a prebuilt page; names never change content."""
+    if not ASSET_NAME.match(name):
+        raise Http404("Unknown asset")
+    return open_immutable(prebuilt_dir() / ASSETS_DIR_NAME / name)
+
+
+def serve_cells(request, name):
+    """Serve one chunk of notebook cells for the lazy-loading page."""
+    if not CELLS_NAME.match(name):
+        raise Http404("Unknown cells")
+    path = prebuilt_dir() / CELLS_DIR_NAME / name
+    available = [
+        encoding
+        for encoding, suffix in ENCODING_SUFFIXES.items()
+        if path.with_name(name + suffix).exists()
+    ]
+    encoding = negotiate_encoding(request, available)
+    if encoding:
+        path = path.with_name(name + ENCODING_SUFFIXES[encoding])
+    response = open_immutable(path, CONTENT_TYPE)
+    return set_content_encoding(response, encoding)
+
+
+def render_prebuilt(request, template_name):
+    """Serve the prebuilt copy of a page, falling back to a normal render.
+
+    With STREAMING_PAGES_ENABLED the fallback streams the page in chunks
+    instead of building (and caching) the whole body in memory.
+    """
+    response = prebuilt_response(request, template_name)
+    if response is not None:
+        return response
+    if settings.STREAMING_PAGES_ENABLED:
+        return render_streaming(request, template_name)
+    return render_cached(request, template_name)
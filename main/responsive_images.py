@@ -0,0 +1,125 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+# Formats in the order browsers should pick them. The <img> gets the last one
+# an image has, the most widely supported, and the rest become <source>s.
+SOURCE_TYPES = [("avif", "image/avif"), ("webp", "image/webp"), ("jpg", "image/jpeg")]
+
+
+@lru_cache(maxsize=1)
+def read_manifest():
+    """(manifest, SHA-256 of its file) as written by optimize_images.py.
+
+    The manifest maps a static path ("images/trees/fig.jpg") to its
+    intrinsic size, the variants generated for it and an inline placeholder:
+    {"width", "height", "sources": {format: [[static path, width], ...]},
+    "placeholder": data URI, "color": "#rrggbb"}. Any but width/height may
+    be missing. Read once per process.
+    """
+    try:
+        with open(settings.RESPONSIVE_IMAGES_MANIFEST, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}, ""
+    return json.loads(data), hashlib.sha256(data).hexdigest()
+
+
+def load_manifest():
+    return read_manifest()[0]
+
+
+def manifest_digest():
+    """Changes whenever the manifest this process renders from does."""
+    return read_manifest()[1]
+
+
+def srcset(variants):
+    return ", ".join(f"{static(path)} {width}w" for path, width in variants)
+
+
+def placeholder_style(entry):
+    """CSS background showing the placeholder (or colour) until the image paints."""
+    if "placeholder" in entry:
+        return (
+            f"background: {entry.get('color', 'transparent')}"
+            f" url({entry['placeholder']})"
+            " center / cover no-repeat"
+        )
+    if "color" in entry:
+        return f"background-color: {entry['color']}"
+    return None
+
+
+def placeholder_attrs(path):
+    """width, height and placeholder style attributes for a hand-written <img>.
+
+    ``height: auto`` keeps CSS sizing the image as it did without a height
+    attribute; the attributes still give the browser its aspect ratio.
+    """
+    entry = load_manifest().get(path)
+    if entry is None:
+        return ""
+    style = "; ".join(filter(None, ["height: auto", placeholder_style(entry)]))
+    return html_attrs(
+        {"width": entry["width"], "height": entry["height"], "style": style}
+    )
+
+
+def render_picture(path, alt, sizes, width=None, height=None, **attrs):
+    """<picture> markup for ``path``, or a plain <img> if it has no variants.
+
+    ``width``/``height`` default to the intrinsic size so the browser can
+    reserve space before the image arrives, and the box shows the image's
+    placeholder until then. Extra keyword arguments (class, loading, ...)
+    become <img> attributes.
+    """
+    entry = load_manifest().get(path)
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    if entry is not None:
+        attrs.setdefault("style", placeholder_style(entry))
+    sources = (entry or {}).get("sources", {})
+    fallback = next(
+        (fmt for fmt, _ in reversed(SOURCE_TYPES) if sources.get(fmt)), None
+    )
+    if fallback is None:
+        entry = entry or {}
+        img_attrs = {
+            "src": static(path),
+            "alt": alt,
+            "width": width or entry.get("width"),
+            "height": height or entry.get("height"),
+        }
+        return format_html("<img{}>", html_attrs({**img_attrs, **attrs}))
+
+    tags = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime, srcset(sources[fmt]), sizes)
+            for fmt, mime in SOURCE_TYPES
+            if fmt != fallback and sources.get(fmt)
+        ),
+    )
+    img_attrs = {
+        "src": static(sources[fallback][-1][0]),
+        "srcset": srcset(sources[fallback]),
+        "sizes": sizes,
+        "alt": alt,
+        "width": width or entry["width"],
+        "height": height or entry["height"],
+    }
+    return format_html(
+        "<picture>{}<img{}></picture>", tags, html_attrs({**img_attrs, **attrs})
+    )
+
+
+def html_attrs(attrs):
+    return format_html_join(
+        "", ' {}="{}"', ((k, v) for k, v in attrs.items() if v is not None)
+    )
@@ -0,0 +1,233 @@
+"""
+Static files storage for Cloudflare R2.
+
+IncrementalManifestStaticStorage fingerprints files like
+ManifestStaticFilesStorage and keeps an inventory of what is already in the
+bucket (name -> SHA-256 of the uploaded content), so collectstatic only
+uploads files whose content changed. Uploads run on a thread pool. The
+inventory is cached in STATIC_INVENTORY_FILE and mirrored to the bucket, and
+it is checked against one bucket listing per run, so objects removed or added
+behind its back are noticed.
+"""
+
+import hashlib
+import json
+import logging
+import mimetypes
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.files.base import ContentFile
+from django.utils.timezone import make_naive
+from storages.backends.s3 import S3StaticStorage
+from storages.utils import clean_name
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_NAME = "staticfiles-inventory.json"
+# ManifestFilesMixin appends the first 12 hex digits of the content's MD5.
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}(\.[^./]+)?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=300"
+
+# S3Storage guesses Content-Type from the name, and .avif isn't in every
+# Python's default table.
+mimetypes.add_type("image/avif", ".avif")
+
+
+class IncrementalManifestStaticStorage(ManifestFilesMixin, S3StaticStorage):
+    """Manifest static storage that uploads changed files only, in parallel.
+
+    Fingerprinted names are immutable and cached for a year. Unhashed copies
+    and the manifest itself get a short max-age, since their content changes
+    under the same name.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Set up first: ManifestFilesMixin reads the manifest during __init__.
+        self._local = threading.local()
+        self._inventory = None
+        self._inventory_lock = threading.Lock()
+        self._executor = None
+        self._pending = []
+        self._deleted = set()
+        self.stats = {"uploaded": 0, "bytes": 0, "skipped": 0, "deleted": 0}
+        super().__init__(*args, **kwargs)
+
+    @property
+    def bucket(self):
+        # boto3 resources aren't thread-safe; S3Storage keeps a connection per
+        # thread, so give each upload thread a bucket from its own connection.
+        bucket = getattr(self._local, "bucket", None)
+        if bucket is None:
+            bucket = self._local.bucket = self.connection.Bucket(self.bucket_name)
+        return bucket
+
+    @property
+    def inventory(self):
+        with self._inventory_lock:
+            if self._inventory is None:
+                self._inventory = self._load_inventory()
+            return self._inventory
+
+    def _list_bucket(self):
+        prefix = f"{self.location}/" if self.location else ""
+        paginator = self.connection.meta.client.get_paginator("list_objects_v2")
+        listing = {}
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for entry in page.get("Contents", ()):
+                name = entry["Key"].removeprefix(prefix)
+                if name != INVENTORY_NAME:
+                    listing[name] = entry["LastModified"].timestamp()
+        return listing
+
+    def _read_cached_inventory(self):
+        path = Path(settings.STATIC_INVENTORY_FILE)
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning("Ignoring unreadable static inventory %s", path)
+        try:
+            with self.open(INVENTORY_NAME) as remote:
+                return json.loads(remote.read())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _load_inventory(self):
+        """One LIST of the bucket, annotated with the hashes we uploaded.
+
+        Objects we have no hash for (uploaded by something else, or before
+        the inventory was lost) are kept with a ``None`` hash: they count as
+        present, and are replaced the first time they are saved.
+        """
+        listing = self._list_bucket()
+        cached = self._read_cached_inventory()
+        inventory = {}
+        for name, modified in listing.items():
+            entry = cached.get(name)
+            sha256 = entry["sha256"] if entry else None
+            inventory[name] = {"sha256": sha256, "modified": modified}
+        logger.info(
+            "Static inventory: %d objects in the bucket, %d with known hashes",
+            len(inventory),
+            sum(1 for entry in inventory.values() if entry["sha256"]),
+        )
+        return inventory
+
+    def _save_inventory(self):
+        data = json.dumps(self.inventory, sort_keys=True, indent=1)
+        path = Path(settings.STATIC_INVENTORY_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data)
+        super()._save(INVENTORY_NAME, ContentFile(data.encode()))
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        params["CacheControl"] = (
+            IMMUTABLE_CACHE_CONTROL
+            if HASHED_NAME.search(name)
+            else REVALIDATE_CACHE_CONTROL
+        )
+        return params
+
+    def exists(self, name):
+        return clean_name(name) in self.inventory
+
+    def get_available_name(self, name, max_length=None):
+        # exists() is truthful here, unlike S3Storage's with file_overwrite,
+        # so skip Storage's search for a free name and replace the file.
+        if self.file_overwrite:
+            return name
+        return super().get_available_name(name, max_length)
+
+    def get_modified_time(self, name):
+        # collectstatic compares this with the source file to skip unchanged
+        # files; the bucket listing already has it, so there's no HEAD request.
+        modified = datetime.fromtimestamp(
+            self.inventory[clean_name(name)]["modified"], timezone.utc
+        )
+        return modified if settings.USE_TZ else make_naive(modified)
+
+    def delete(self, name):
+        # collectstatic and post_process delete a file right before saving it
+        # again. Hold deletes back until the end of the run so an unchanged
+        # file is neither deleted nor uploaded.
+        name = clean_name(name)
+        if name in self.inventory:
+            self._deleted.add(name)
+
+    def _save(self, name, content):
+        name = clean_name(name)
+        content.seek(0)
+        data = content.read()
+        if isinstance(data, str):
+            data = data.encode()
+        sha256 = hashlib.sha256(data).hexdigest()
+        self._deleted.discard(name)
+
+        entry = self.inventory.get(name)
+        if entry and entry["sha256"] is None and HASHED_NAME.search(name):
+            # A fingerprinted name already in the bucket has the same content.
+            entry["sha256"] = sha256
+        if entry and entry["sha256"] == sha256:
+            self.stats["skipped"] += 1
+            return name
+
+        self.inventory[name] = {"sha256": sha256, "modified": time.time()}
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.STATIC_UPLOAD_WORKERS,
+                thread_name_prefix="static-upload",
+            )
+        upload = self._executor.submit(super()._save, name, ContentFile(data))
+        self._pending.append((name, upload))
+        self.stats["uploaded"] += 1
+        self.stats["bytes"] += len(data)
+        return name
+
+    def wait(self):
+        """Block until queued uploads finish; raise the first failure."""
+        pending, self._pending = self._pending, []
+        errors = []
+        for name, upload in pending:
+            try:
+                upload.result()
+            except Exception as exc:
+                # Don't record a hash for something that never arrived.
+                self.inventory.pop(name, None)
+                errors.append(exc)
+        if errors:
+            raise errors[0]
+
+    def post_process(self, *args, **kwargs):
+        # Post-processing reads the unhashed copies back from the bucket.
+        self.wait()
+        yield from super().post_process(*args, **kwargs)
+
+    def save_manifest(self):
+        # Every file the manifest points to must be in the bucket first.
+        self.wait()
+        super().save_manifest()
+        self.wait()
+        self._flush_deletes()
+        self._save_inventory()
+        logger.info(
+            "Static upload: %(uploaded)d files (%(bytes)d bytes) uploaded,"
+            " %(skipped)d unchanged, %(deleted)d deleted",
+            self.stats,
+        )
+
+    def _flush_deletes(self):
+        for name in sorted(self._deleted):
+            super().delete(name)
+            self.inventory.pop(name, None)
+            self.stats["deleted"] += 1
+        self._deleted.clear()
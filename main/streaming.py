@@ -0,0 +1,59 @@
+from django.http import StreamingHttpResponse
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.utils.cache import patch_vary_headers
+
+from .page_cache import (
+    is_page_cacheable,
+    not_modified_response,
+    page_cache_key,
+    page_etag,
+    set_validators,
+    template_last_modified,
+)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_template(template_name, context=None, request=None):
+    """Render a template node by node, yielding encoded chunks.
+
+    Each top-level node is rendered and sent before the next one starts, so a
+    flat multi-megabyte document never exists as one string or bytes object.
+    Templates built on {% extends %} render as a single node and gain little.
+    """
+    backend_template = get_template(template_name)
+    template = backend_template.template
+    context = make_context(
+        context, request, autoescape=backend_template.backend.engine.autoescape
+    )
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            for node in template.nodelist:
+                text = node.render_annotated(context)
+                for start in range(0, len(text), STREAM_CHUNK_SIZE):
+                    end = start + STREAM_CHUNK_SIZE
+                    yield text[start:end].encode("utf-8")
+
+
+def render_streaming(request, template_name, context=None):
+    """Streaming counterpart of render_cached() for very large pages."""
+    cacheable = is_page_cacheable(request)
+    if cacheable:
+        key = page_cache_key(template_name, context)
+        etag = page_etag(key.partition(":")[2], None)
+        last_modified = template_last_modified(template_name)
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            patch_vary_headers(response, ("Cookie",))
+            return response
+
+    response = StreamingHttpResponse(
+        stream_template(template_name, context, request),
+        content_type="text/html; charset=utf-8",
+    )
+    if cacheable:
+        set_validators(response, etag, last_modified)
+    patch_vary_headers(response, ("Cookie",))
+    return response
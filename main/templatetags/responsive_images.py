@@ -0,0 +1,33 @@
+from django import template
+
+from ..responsive_images import placeholder_attrs, render_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(path, alt, sizes="100vw", **attrs):
+    """Render a <picture> with AVIF/WebP/JPEG srcsets for a static image.
+
+    Usage:
+        {% load responsive_images %}
+        {% responsive_image "images/trees/fig.jpg" "Fig Tree" sizes="350px" %}
+
+    Widths come from the manifest written by optimize_images.py; images
+    that aren't in it render as a plain <img>.
+    """
+    return render_picture(path, alt, sizes, **attrs)
+
+
+@register.simple_tag
+def image_placeholder(path):
+    """width/height/style attributes that show a static image's placeholder.
+
+    For <img> tags written out by hand:
+        <img src="{% static path %}" alt="..."{% image_placeholder path %}>
+
+    The box gets its final size and the placeholder (or dominant colour)
+    as a background until the image paints. Nothing for images that
+    aren't in the manifest.
+    """
+    return placeholder_attrs(path)
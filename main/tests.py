@@ -1,3 +1,1343 @@
-from django.test import TestCase
+import base64
+import copy
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import logging
+import logging.config
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import brotli
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.log import configure_logging
+from moto import mock_aws
+from PIL import Image
+
+from chesley_web.queue_logging import QueuedHandler
+from chesley_web.settings import base as base_settings
+from chesley_web.settings import development as development_settings
+
+from .compression import negotiate_encoding
+from .growth_log import observation_page
+from .models import Observation, Photo, Plant
+from .notebook_cells import build_lazy_page
+from .notebook_images import extract_images, write_atomic
+from .page_cache import page_cache_key
+from .prebuilt import build_pages
+from .responsive_images import placeholder_style
+from .storage import IncrementalManifestStaticStorage
+from .tree_photos import filename_date
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_cached(self):
+        first = self.client.get("/about/")
+        self.assertIsNotNone(cache.get(page_cache_key("about/index.html")))
+
+        second = self.client.get("/about/")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+
+    def test_response_varies_on_cookie(self):
+        response = self.client.get("/about/")
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_authenticated_user_bypasses_cache(self):
+        self.client.get("/about/")
+        user = get_user_model().objects.create_user("reader", password="pw-12345")
+        self.client.force_login(user)
+
+        response = self.client.get("/about/")
+        self.assertContains(response, "reader")
+
+    def test_authenticated_render_is_not_stored(self):
+        user = get_user_model().objects.create_user("reader", password="pw-12345")
+        self.client.force_login(user)
+
+        self.client.get("/about/")
+        self.assertIsNone(cache.get(page_cache_key("about/index.html")))
+
+
+PROJECT1 = "learning/pgp_aiml/project1.html"
+PROJECT1_URL = "/learning/pgp_aiml/project1"
+
+
+class PrebuiltTestCase(TestCase):
+    """Builds project1 once per class into its own PREBUILT_PAGES_DIR."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.output_dir = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.output_dir)
+        cls.entry = build_pages([PROJECT1], cls.output_dir)[PROJECT1]
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(override_settings(PREBUILT_PAGES_DIR=str(self.output_dir)))
+
+
+class PrebuiltPageTests(PrebuiltTestCase):
+    def test_serves_prebuilt_file(self):
+        response = self.client.get(PROJECT1_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            (self.output_dir / self.entry["file"]).read_bytes(),
+        )
+
+    def test_stale_build_falls_back_to_render(self):
+        with mock.patch("main.prebuilt.template_fingerprint", return_value="stale"):
+            response = self.client.get(PROJECT1_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+
+    def test_disabled(self):
+        with self.settings(PREBUILT_PAGES_ENABLED=False):
+            response = self.client.get(PROJECT1_URL)
+        self.assertFalse(response.streaming)
+
+    def test_accel_redirect(self):
+        with self.settings(PREBUILT_PAGES_ACCEL_PREFIX="/_prebuilt/"):
+            response = self.client.get(PROJECT1_URL)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/_prebuilt/" + self.entry["file"]
+        )
+        self.assertEqual(response.content, b"")
+
+
+def inline_png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class ExtractImagesTests(SimpleTestCase):
+    def setUp(self):
+        self.asset_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.asset_dir)
+
+    def extract(self, html, **kwargs):
+        return extract_images(
+            html, self.asset_dir, lambda name: f"/assets/{name}", **kwargs
+        )
+
+    def test_inline_images_become_files(self):
+        data = inline_png("red")
+        html = (
+            f'<img src="data:image/png;base64,{data}">'
+            f'<img alt="again" src="data:image/png;base64,{data}">'
+            '<img src="/static/logo.png">'
+        )
+        rewritten, assets, stats = self.extract(html)
+
+        self.assertEqual(len(assets), 1)
+        self.assertRegex(assets[0], r"^[0-9a-f]{16}\.png$")
+        self.assertEqual(
+            (self.asset_dir / assets[0]).read_bytes(), base64.b64decode(data)
+        )
+        self.assertEqual(rewritten.count(f'src="/assets/{assets[0]}"'), 2)
+        self.assertEqual(rewritten.count('loading="lazy"'), 2)
+        self.assertNotIn("data:image", rewritten)
+        self.assertIn('<img src="/static/logo.png">', rewritten)
+        self.assertEqual(stats["images"], 2)
+
+    def test_webp_reencoding(self):
+        _, assets, _ = self.extract(
+            f'<img src="data:image/png;base64,{inline_png("blue")}">', webp=True
+        )
+        self.assertTrue(assets[0].endswith((".webp", ".png")))
+
+    def test_broken_data_is_left_alone(self):
+        html = '<img src="data:image/png;base64,abc">'
+        rewritten, assets, _ = self.extract(html)
+        self.assertEqual(rewritten, html)
+        self.assertEqual(assets, [])
+
+
+class NotebookAssetTests(SimpleTestCase):
+    def setUp(self):
+        self.prebuilt_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.prebuilt_dir)
+        (self.prebuilt_dir / "assets").mkdir()
+        self.enterContext(override_settings(PREBUILT_PAGES_DIR=str(self.prebuilt_dir)))
+
+    def test_asset_is_served_immutable(self):
+        (self.prebuilt_dir / "assets" / "0123456789abcdef.png").write_bytes(b"png")
+        response = self.client.get("/learning/pgp_aiml/assets/0123456789abcdef.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"png")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_unknown_or_malformed_name_is_404(self):
+        for name in ("0123456789abcdef.png", "manifest.json", "..%2Fmanifest.json"):
+            with self.subTest(name=name):
+                response = self.client.get(f"/learning/pgp_aiml/assets/{name}")
+                self.assertEqual(response.status_code, 404)
+
+
+class WriteAtomicTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_replaces_file_without_leftovers(self):
+        path = self.directory / "page.html"
+        write_atomic(path, b"old")
+        write_atomic(path, b"new")
+        self.assertEqual(path.read_bytes(), b"new")
+        self.assertEqual(os.listdir(self.directory), ["page.html"])
+
+    def test_umask_permissions(self):
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+        path = self.directory / "image.png"
+        write_atomic(path, b"png")
+        self.assertEqual(path.stat().st_mode & 0o777, 0o644)
+
+    def test_failed_write_keeps_old_file(self):
+        path = self.directory / "page.html"
+        write_atomic(path, b"old")
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_atomic(path, b"new")
+        self.assertEqual(path.read_bytes(), b"old")
+        self.assertEqual(os.listdir(self.directory), ["page.html"])
+
+
+class NegotiateEncodingTests(SimpleTestCase):
+    def negotiate(self, header, available=("br", "gzip")):
+        request = RequestFactory().get("/", headers={"accept-encoding": header})
+        return negotiate_encoding(request, available)
+
+    def test_prefers_brotli(self):
+        self.assertEqual(self.negotiate("gzip, br"), "br")
+
+    def test_q_values(self):
+        self.assertEqual(self.negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertIsNone(self.negotiate("br;q=0, gzip;q=0"))
+
+    def test_wildcard(self):
+        self.assertEqual(self.negotiate("*"), "br")
+        self.assertEqual(self.negotiate("*;q=0, gzip"), "gzip")
+
+    def test_unavailable_or_missing(self):
+        self.assertEqual(self.negotiate("br, gzip", available=("gzip",)), "gzip")
+        self.assertIsNone(self.negotiate(""))
+        self.assertIsNone(self.negotiate("deflate"))
+
+
+class CompressedPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, accept_encoding):
+        return self.client.get("/about/", headers={"accept-encoding": accept_encoding})
+
+    def test_variants_decode_to_identity_body(self):
+        identity = self.get("identity").content
+        for encoding, decompress in [
+            ("gzip", gzip.decompress),
+            ("br", brotli.decompress),
+        ]:
+            with self.subTest(encoding=encoding):
+                response = self.get(encoding)
+                self.assertEqual(response["Content-Encoding"], encoding)
+                self.assertEqual(decompress(response.content), identity)
+
+    def test_identity_and_vary(self):
+        response = self.get("identity")
+        self.assertNotIn("Content-Encoding", response)
+        vary = {v.strip().lower() for v in response["Vary"].split(",")}
+        self.assertTrue({"cookie", "accept-encoding"} <= vary)
+
+
+class PrebuiltCompressionTests(PrebuiltTestCase):
+    def test_precompressed_variant(self):
+        response = self.client.get(PROJECT1_URL, headers={"accept-encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)),
+            (self.output_dir / self.entry["file"]).read_bytes(),
+        )
+
+
+class SmallPageEncodingTests(TestCase):
+    """Pages below MIN_COMPRESS_SIZE have no variants and are always identity."""
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch("main.compression.MIN_COMPRESS_SIZE", 10**9))
+
+    def test_identity_etag_whatever_the_client_accepts(self):
+        response = self.client.get("/about/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertTrue(response["ETag"].endswith('-identity"'))
+        self.assertEqual(self.client.get("/about/")["ETag"], response["ETag"])
+
+    def test_304_without_loading_the_page(self):
+        etag = self.client.get("/about/", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        cache.delete(page_cache_key("about/index.html"))
+        for fast_path in (True, False):
+            with self.subTest(fast_path=fast_path), override_settings(
+                PAGE_CACHE_FAST_PATH=fast_path
+            ), mock.patch("main.page_cache.render") as render:
+                response = self.client.get(
+                    "/about/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                render.assert_not_called()
+
+    def test_etag_checked_after_render_when_encodings_unknown(self):
+        etag = self.client.get("/about/")["ETag"]
+        cache.clear()
+        response = self.client.get(
+            "/about/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_matching_etag_gets_304(self):
+        first = self.client.get("/about/")
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        second = self.client.get("/about/", headers={"if-none-match": first["ETag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.content, b"")
+
+    def test_matching_last_modified_gets_304(self):
+        first = self.client.get("/about/")
+        second = self.client.get(
+            "/about/", headers={"if-modified-since": first["Last-Modified"]}
+        )
+        self.assertEqual(second.status_code, 304)
+
+    def test_stale_etag_gets_full_page(self):
+        response = self.client.get("/about/", headers={"if-none-match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_each_encoding_has_its_own_etag(self):
+        plain = self.client.get("/about/", headers={"accept-encoding": "identity"})
+        gzipped = self.client.get("/about/", headers={"accept-encoding": "gzip"})
+        self.assertNotEqual(plain["ETag"], gzipped["ETag"])
+
+    def test_authenticated_response_has_no_validators(self):
+        user = get_user_model().objects.create_user("reader", password="pw-12345")
+        self.client.force_login(user)
+        response = self.client.get("/about/")
+        self.assertNotIn("ETag", response)
+
+
+class StreamingPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(self.settings(PREBUILT_PAGES_ENABLED=False))
+
+    def test_streams_same_page_as_render(self):
+        rendered = self.client.get(PROJECT1_URL).content
+        cache.clear()
+        with self.settings(STREAMING_PAGES_ENABLED=True):
+            response = self.client.get(PROJECT1_URL)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), rendered)
+
+    def test_streamed_page_answers_conditional_get(self):
+        with self.settings(STREAMING_PAGES_ENABLED=True):
+            first = self.client.get(PROJECT1_URL)
+            b"".join(first.streaming_content)
+            second = self.client.get(
+                PROJECT1_URL, headers={"if-none-match": first["ETag"]}
+            )
+        self.assertEqual(second.status_code, 304)
+
+
+def notebook(cells):
+    body = "".join(f'<div class="jp-Cell jp-CodeCell">cell {i}</div>' for i in cells)
+    return f"<html><body><main>{body}</main><footer></footer></body></html>"
+
+
+class LazyPageSplitTests(SimpleTestCase):
+    def test_splits_later_cells_into_chunks(self):
+        written = []
+
+        def write_chunk(content):
+            written.append(content.decode())
+            return f"/cells/{len(written)}.html"
+
+        page, index = build_lazy_page(notebook(range(5)), 2, 2, write_chunk)
+
+        self.assertIn("cell 1", page)
+        self.assertNotIn("cell 2", page)
+        self.assertIn("/cells/1.html", page)
+        self.assertIn("/cells/2.html", page)
+        self.assertTrue(page.endswith("</main><footer></footer></body></html>"))
+        self.assertEqual(len(written), 2)
+        self.assertIn("cell 3", written[0])
+        self.assertIn("cell 4", written[1])
+        self.assertEqual(index["count"], 5)
+        self.assertEqual(
+            [(c["start"], c["end"]) for c in index["chunks"]], [(2, 4), (4, 5)]
+        )
+
+    def test_short_or_foreign_documents_are_not_split(self):
+        self.assertEqual(build_lazy_page(notebook(range(2)), 2, 2, None), (None, None))
+        self.assertEqual(build_lazy_page("<p>hello</p>", 2, 2, None), (None, None))
+
+
+class LazyCellsTests(PrebuiltTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(self.settings(NOTEBOOK_LAZY_CELLS=True))
+        self.cells = self.entry["cells"]
+
+    def test_page_ships_first_cells_only(self):
+        response = self.client.get(PROJECT1_URL)
+        body = b"".join(response.streaming_content)
+        self.assertEqual(body, (self.output_dir / self.cells["file"]).read_bytes())
+        for chunk in self.cells["chunks"]:
+            self.assertIn(chunk["url"].encode(), body)
+
+    def test_full_page_on_request(self):
+        response = self.client.get(PROJECT1_URL, {"full": "1"})
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            (self.output_dir / self.entry["file"]).read_bytes(),
+        )
+
+    def test_chunks_are_served_immutable_and_compressed(self):
+        url = self.cells["chunks"][0]["url"]
+        plain = self.client.get(url)
+        self.assertEqual(plain.status_code, 200)
+        self.assertIn("immutable", plain["Cache-Control"])
+        body = b"".join(plain.streaming_content)
+
+        gzipped = self.client.get(url, headers={"accept-encoding": "gzip"})
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(gzipped.streaming_content)), body)
+
+    def test_unknown_chunk_is_404(self):
+        for name in ("0123456789abcdef.html", "manifest.json"):
+            with self.subTest(name=name):
+                response = self.client.get(f"/learning/pgp_aiml/cells/{name}")
+                self.assertEqual(response.status_code, 404)
+
+
+class ServerTimingTests(TestCase):
+    def test_header_lists_every_phase(self):
+        response = self.client.get("/about/")
+        phases = [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+        self.assertEqual(
+            phases, ["total", "middleware", "url", "view", "db", "template"]
+        )
+
+    def test_header_can_be_turned_off(self):
+        with self.settings(SERVER_TIMING_HEADER=False):
+            response = self.client.get("/about/")
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(METRICS_TOKEN="s3cret")
+class MetricsEndpointTests(TestCase):
+    def get(self, token=None):
+        headers = {"authorization": f"Bearer {token}"} if token is not None else {}
+        return self.client.get("/metrics/", headers=headers)
+
+    def test_requires_token_or_staff(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get("wrong").status_code, 403)
+
+    def test_empty_token_never_matches(self):
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.get("").status_code, 403)
+
+    def test_token_gets_histograms(self):
+        self.client.get("/about/")
+        response = self.get("s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "django_request_phase_seconds_bucket")
+        self.assertContains(response, 'route="about"')
+
+    def test_staff_user(self):
+        user = get_user_model().objects.create_user(
+            "admin", password="pw-12345", is_staff=True
+        )
+        self.client.force_login(user)
+        self.assertEqual(self.get().status_code, 200)
+
+
+def exc_record():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        return logging.makeLogRecord(
+            {"msg": "failed %s", "args": ("here",), "exc_info": sys.exc_info()}
+        )
+
+
+class QueuedHandlerTests(SimpleTestCase):
+    def test_prepare_renders_traceback(self):
+        handler = QueuedHandler("logging.StreamHandler", stream=io.StringIO())
+        self.addCleanup(handler.close)
+        record = exc_record()
+
+        prepared = handler.prepare(record)
+
+        self.assertTrue(prepared.msg.startswith("failed here\nTraceback"))
+        self.assertTrue(prepared.msg.endswith("ValueError: boom"))
+        self.assertEqual(
+            (prepared.args, prepared.exc_info, prepared.exc_text), (None, None, None)
+        )
+        self.assertIsNotNone(record.exc_info)
+
+    def test_logging_settings_configure(self):
+        log_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, log_dir)
+        self.addCleanup(configure_logging, settings.LOGGING_CONFIG, settings.LOGGING)
+        for module in (base_settings, development_settings):
+            with self.subTest(settings=module.__name__):
+                config = copy.deepcopy(module.LOGGING)
+                log_file = log_dir / f"{module.__name__}.log"
+                console = io.StringIO()
+                config["handlers"]["file"]["filename"] = str(log_file)
+                config["handlers"]["console"]["stream"] = console
+                # Keep the record away from the test runner's own handlers.
+                config["loggers"]["chesley_web"]["propagate"] = False
+                logging.config.dictConfig(config)
+
+                logging.getLogger("chesley_web.tests").error(
+                    "failed %s", "here", exc_info=exc_record().exc_info
+                )
+                for handler in logging.getLogger("chesley_web").handlers:
+                    handler.close()
+
+                for output in (log_file.read_text(), console.getvalue()):
+                    self.assertIn("ERROR", output)
+                    self.assertIn("failed here\nTraceback", output)
+                    self.assertIn("ValueError: boom", output)
+
+
+class FastPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_cookieless_request_skips_sessions(self):
+        first = self.client.get("/about/")
+        self.assertTrue(hasattr(first.wsgi_request, "session"))
+
+        second = self.client.get("/about/")
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(hasattr(second.wsgi_request, "session"))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["X-Frame-Options"], settings.X_FRAME_OPTIONS)
+
+    def test_session_cookie_takes_normal_path(self):
+        self.client.get("/about/")
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "unknown"
+        response = self.client.get("/about/")
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_can_be_turned_off(self):
+        with self.settings(PAGE_CACHE_FAST_PATH=False):
+            self.client.get("/about/")
+            response = self.client.get("/about/")
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+
+@mock_aws
+class IncrementalStaticStorageTests(SimpleTestCase):
+    bucket = "static-test"
+
+    def setUp(self):
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket=self.bucket)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        inventory = str(Path(directory) / "inventory.json")
+        self.enterContext(override_settings(STATIC_INVENTORY_FILE=inventory))
+
+    def storage(self):
+        return IncrementalManifestStaticStorage(
+            bucket_name=self.bucket, region_name="us-east-1", file_overwrite=True
+        )
+
+    def deploy(self, files, deletes=()):
+        """One collectstatic-like run; returns the storage's stats."""
+        storage = self.storage()
+        for name in deletes:
+            storage.delete(name)
+        for name, content in files.items():
+            storage.save(name, ContentFile(content))
+        storage.save_manifest()
+        return storage.stats
+
+    def keys(self):
+        listing = self.s3.list_objects_v2(Bucket=self.bucket).get("Contents", [])
+        return {entry["Key"] for entry in listing}
+
+    def test_unchanged_files_are_not_uploaded_again(self):
+        files = {"css/site.css": b"body {}", "js/app.js": b"run()"}
+        self.deploy(files)
+
+        stats = self.deploy({**files, "js/app.js": b"run(1)"})
+        # Only app.js changed; site.css and the manifest are skipped.
+        self.assertEqual((stats["uploaded"], stats["skipped"]), (1, 2))
+        body = self.s3.get_object(Bucket=self.bucket, Key="js/app.js")["Body"]
+        self.assertEqual(body.read(), b"run(1)")
+
+    def test_exists_follows_the_bucket(self):
+        self.deploy({"css/site.css": b"body {}"})
+        self.s3.put_object(Bucket=self.bucket, Key="img/logo.png", Body=b"png")
+
+        storage = self.storage()
+        self.assertTrue(storage.exists("css/site.css"))
+        self.assertTrue(storage.exists("img/logo.png"))
+        self.assertFalse(storage.exists("css/missing.css"))
+
+    def test_delete_then_save_keeps_unchanged_file(self):
+        self.deploy({"css/site.css": b"body {}"})
+        stats = self.deploy({"css/site.css": b"body {}"}, deletes=["css/site.css"])
+        self.assertEqual((stats["uploaded"], stats["deleted"]), (0, 0))
+        self.assertIn("css/site.css", self.keys())
+
+    def test_deletes_happen_at_the_end_of_the_run(self):
+        self.deploy({"css/old.css": b"old", "css/site.css": b"body {}"})
+        stats = self.deploy({}, deletes=["css/old.css"])
+        self.assertEqual(stats["deleted"], 1)
+        self.assertNotIn("css/old.css", self.keys())
+        self.assertIn("css/site.css", self.keys())
+
+    def test_cache_control_by_name(self):
+        self.deploy({"css/site.0123456789ab.css": b"body {}", "css/site.css": b"x"})
+        hashed = self.s3.head_object(
+            Bucket=self.bucket, Key="css/site.0123456789ab.css"
+        )
+        plain = self.s3.head_object(Bucket=self.bucket, Key="css/site.css")
+        self.assertIn("immutable", hashed["CacheControl"])
+        self.assertNotIn("immutable", plain["CacheControl"])
+
+
+class AssetVersionTests(SimpleTestCase):
+    def test_page_key_follows_asset_manifests(self):
+        key = page_cache_key("about/index.html")
+        with mock.patch("main.page_cache.manifest_digest", return_value="new"):
+            self.assertNotEqual(page_cache_key("about/index.html"), key)
+        storage = mock.Mock(manifest_hash="rebuilt")
+        with mock.patch("main.page_cache.staticfiles_storage", storage):
+            self.assertNotEqual(page_cache_key("about/index.html"), key)
+
+
+SCRIPTS_DIR = Path(settings.BASE_DIR) / "backend" / "scripts"
+
+
+def import_script(name):
+    """Import one of backend/scripts, which aren't a package."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+    return importlib.import_module(name)
+
+
+class R2SyncPlanTests(SimpleTestCase):
+    def setUp(self):
+        self.r2_sync = import_script("r2_sync")
+        self.source = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.source)
+        (self.source / "fig.jpg").write_bytes(b"fig")
+        (self.source / "notes.txt").write_bytes(b"not an image")
+        self.local = self.r2_sync.local_files(
+            self.source, set(self.r2_sync.IMAGE_EXTENSIONS)
+        )
+
+    def plan(self, remote, inventory=None):
+        uploads, unchanged, deletions, _ = self.r2_sync.plan(
+            self.local, remote, inventory or {}
+        )
+        return [key for key, _, _ in uploads], unchanged, deletions
+
+    def test_only_images_are_synced(self):
+        self.assertEqual(list(self.local), ["fig.jpg"])
+
+    def test_new_file_is_uploaded(self):
+        self.assertEqual(self.plan({}), (["fig.jpg"], [], []))
+
+    def test_inventory_hash_match_is_unchanged(self):
+        remote = {"fig.jpg": {"etag": "multipart-2", "size": 3}}
+        inventory = {
+            "fig.jpg": {
+                "sha256": hashlib.sha256(b"fig").hexdigest(),
+                "etag": "multipart-2",
+                "size": 3,
+            }
+        }
+        self.assertEqual(self.plan(remote, inventory), ([], ["fig.jpg"], []))
+
+    def test_changed_content_is_uploaded(self):
+        remote = {"fig.jpg": {"etag": "e", "size": 3}}
+        inventory = {"fig.jpg": {"sha256": "old", "etag": "e", "size": 3}}
+        self.assertEqual(self.plan(remote, inventory), (["fig.jpg"], [], []))
+
+    def test_unknown_object_is_compared_by_md5(self):
+        md5 = hashlib.md5(b"fig").hexdigest()
+        self.assertEqual(
+            self.plan({"fig.jpg": {"etag": md5, "size": 3}}), ([], ["fig.jpg"], [])
+        )
+        self.assertEqual(
+            self.plan({"fig.jpg": {"etag": "other", "size": 3}}), (["fig.jpg"], [], [])
+        )
+
+    def test_object_replaced_behind_the_inventory_is_uploaded(self):
+        remote = {"fig.jpg": {"etag": "new", "size": 3}}
+        inventory = {
+            "fig.jpg": {
+                "sha256": hashlib.sha256(b"fig").hexdigest(),
+                "etag": "old",
+                "size": 3,
+            }
+        }
+        self.assertEqual(self.plan(remote, inventory), (["fig.jpg"], [], []))
+
+    def test_remote_only_objects_are_deleted(self):
+        md5 = hashlib.md5(b"fig").hexdigest()
+        remote = {
+            "fig.jpg": {"etag": md5, "size": 3},
+            "old/avocado.jpg": {"etag": "x", "size": 9},
+        }
+        self.assertEqual(self.plan(remote), ([], ["fig.jpg"], ["old/avocado.jpg"]))
+
+
+FIG_SOURCES = {
+    fmt: [[f"images/trees/fig-{w}w.{fmt}", w] for w in (320, 640)]
+    for fmt in ("avif", "webp", "jpg")
+}
+
+
+class ResponsiveImageTagTests(SimpleTestCase):
+    manifest = {
+        "images/trees/fig.jpg": {"width": 640, "height": 480, "sources": FIG_SOURCES}
+    }
+
+    def setUp(self):
+        self.enterContext(
+            mock.patch(
+                "main.responsive_images.load_manifest", return_value=self.manifest
+            )
+        )
+
+    def render(self, tag, **context):
+        return Template("{% load responsive_images %}" + tag).render(Context(context))
+
+    def test_picture_with_sources(self):
+        html = self.render(
+            '{% responsive_image "images/trees/fig.jpg" "Fig" sizes="50vw" %}'
+        )
+        self.assertTrue(html.startswith("<picture><source "))
+        self.assertIn(
+            '<source type="image/avif" srcset="/static/images/trees/fig-320w.avif 320w,'
+            ' /static/images/trees/fig-640w.avif 640w" sizes="50vw">',
+            html,
+        )
+        self.assertLess(html.index("image/avif"), html.index("image/webp"))
+        self.assertInHTML(
+            '<img src="/static/images/trees/fig-640w.jpg"'
+            ' srcset="/static/images/trees/fig-320w.jpg 320w,'
+            ' /static/images/trees/fig-640w.jpg 640w"'
+            ' sizes="50vw" alt="Fig" width="640" height="480"'
+            ' loading="lazy" decoding="async">',
+            html,
+        )
+
+    def test_overrides_and_extra_attributes(self):
+        html = self.render(
+            '{% responsive_image "images/trees/fig.jpg" "Fig" width=320 height=240'
+            ' loading="eager" class="card" %}'
+        )
+        self.assertIn('width="320" height="240"', html)
+        self.assertIn('loading="eager"', html)
+        self.assertIn('class="card"', html)
+
+    def test_unknown_image_is_plain_img(self):
+        html = self.render('{% responsive_image "images/other.jpg" "Other" %}')
+        self.assertInHTML(
+            '<img src="/static/images/other.jpg" alt="Other" loading="lazy"'
+            ' decoding="async">',
+            html,
+        )
+
+    def test_alt_is_escaped(self):
+        html = self.render(
+            '{% responsive_image "images/trees/fig.jpg" alt %}', alt="<b>"
+        )
+        self.assertIn('alt="&lt;b&gt;"', html)
+
+
+class ResponsiveFallbackTests(SimpleTestCase):
+    manifest = {
+        "images/trees/fig.jpg": {
+            "width": 640,
+            "height": 480,
+            "sources": {fmt: FIG_SOURCES[fmt] for fmt in ("avif", "webp")},
+        },
+        "images/trees/lemon.jpg": {
+            "width": 640,
+            "height": 480,
+            "sources": {"avif": [], "webp": []},
+        },
+    }
+
+    def setUp(self):
+        self.enterContext(
+            mock.patch(
+                "main.responsive_images.load_manifest", return_value=self.manifest
+            )
+        )
+
+    def render(self, path):
+        tag = '{% load responsive_images %}{% responsive_image path "Alt" %}'
+        return Template(tag).render(Context({"path": path}))
+
+    def test_widest_supported_format_is_the_img(self):
+        html = self.render("images/trees/fig.jpg")
+        self.assertIn('<source type="image/avif"', html)
+        self.assertNotIn('<source type="image/webp"', html)
+        self.assertIn('<img src="/static/images/trees/fig-640w.webp"', html)
+
+    def test_no_variants_is_plain_img(self):
+        html = self.render("images/trees/lemon.jpg")
+        self.assertTrue(html.startswith('<img src="/static/images/trees/lemon.jpg"'))
+
+
+class ResponsiveLadderTests(SimpleTestCase):
+    def setUp(self):
+        self.optimize_images = import_script("optimize_images")
+        self.static_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        self.enterContext(
+            mock.patch.object(self.optimize_images, "STATIC_DIR", self.static_dir)
+        )
+
+    def test_ladder_widths(self):
+        ladder_widths = self.optimize_images.ladder_widths
+        self.assertEqual(ladder_widths(1200), [320, 640, 960, 1200])
+        self.assertEqual(ladder_widths(700), [320, 640, 700])
+        self.assertEqual(ladder_widths(200), [200])
+        self.assertEqual(ladder_widths(2000), [320, 640, 960, 1200])
+
+    def test_variants_and_manifest_entry(self):
+        output_dir = self.static_dir / "images" / "trees"
+        output_dir.mkdir(parents=True)
+        img = Image.new("RGB", (700, 350), "green")
+
+        entry = self.optimize_images.save_responsive_variants(
+            img, "fig", output_dir, 300 * 1024
+        )
+
+        self.assertEqual(entry["key"], "images/trees/fig.jpg")
+        self.assertEqual((entry["width"], entry["height"]), (700, 350))
+        self.assertEqual(set(entry["sources"]), {"avif", "webp", "jpg"})
+        self.assertEqual(
+            [list(v) for v in entry["sources"]["jpg"]],
+            [
+                ["images/trees/fig-320w.jpg", 320],
+                ["images/trees/fig-640w.jpg", 640],
+                ["images/trees/fig-700w.jpg", 700],
+            ],
+        )
+        for variants in entry["sources"].values():
+            for path, width in variants:
+                with Image.open(self.static_dir / path) as variant:
+                    self.assertEqual(variant.width, width)
+
+
+class QualitySearchTests(SimpleTestCase):
+    def setUp(self):
+        self.optimize_images = import_script("optimize_images")
+        self.img = Image.effect_noise((160, 120), 40).convert("RGB")
+        self.candidates = list(range(95, 15, -5))
+        self.sizes = [
+            len(self.optimize_images.encode(self.img, "JPEG", q))
+            for q in self.candidates
+        ]
+
+    def search(self, limit):
+        return self.optimize_images.encode_within_limit(self.img, "JPEG", 95, limit)
+
+    def test_picks_highest_quality_that_fits(self):
+        for index, limit in enumerate(self.sizes):
+            with self.subTest(quality=self.candidates[index]):
+                data, quality, encodes = self.search(limit)
+                expected = next(
+                    q for q, size in zip(self.candidates, self.sizes) if size <= limit
+                )
+                self.assertEqual(quality, expected)
+                self.assertLessEqual(len(data), limit)
+                self.assertLessEqual(encodes, 9)
+
+    def test_first_quality_fits(self):
+        _, quality, encodes = self.search(self.sizes[0])
+        self.assertEqual((quality, encodes), (95, 1))
+
+    def test_nothing_fits(self):
+        data, quality, _ = self.search(1)
+        self.assertEqual(quality, 20)
+        self.assertEqual(data, self.optimize_images.encode(self.img, "JPEG", 20))
+
+
+class OptimizePoolTests(SimpleTestCase):
+    def setUp(self):
+        self.optimize_images = import_script("optimize_images")
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        self.dirs = [root / name for name in ("in", "out", "originals")]
+        for path in self.dirs:
+            path.mkdir()
+        self.manifest = root / "manifest.json"
+        self.enterContext(mock.patch.object(self.optimize_images, "STATIC_DIR", root))
+        for name in ("a", "b", "c", "d"):
+            Image.new("RGB", (64, 48), "green").save(self.dirs[0] / f"{name}.jpg")
+
+    def run_fake(self, **kwargs):
+        """process_images() with a stand-in worker that records concurrency."""
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def fake(input_path, *args):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return {"key": input_path.name}, threading.current_thread().name, 0.05
+
+        with mock.patch.object(self.optimize_images, "run_optimize_image", fake):
+            result = self.optimize_images.process_images(
+                *self.dirs, mode="thread", manifest_path=self.manifest, **kwargs
+            )
+        return result, peak[0]
+
+    def test_workers_bound_in_flight_images(self):
+        (done, failed, _), peak = self.run_fake(workers=2)
+        self.assertEqual((done, failed), (4, 0))
+        self.assertEqual(peak, 2)
+
+    def test_memory_budget_bounds_in_flight_images(self):
+        (done, failed, _), peak = self.run_fake(workers=4, memory_limit=1)
+        self.assertEqual((done, failed), (4, 0))
+        self.assertEqual(peak, 1)
+
+    def test_process_mode(self):
+        done, failed, _ = self.optimize_images.process_images(
+            *self.dirs, mode="process", workers=2, manifest_path=self.manifest
+        )
+        self.assertEqual((done, failed), (4, 0))
+        self.assertTrue((self.dirs[1] / "a-64w.webp").exists())
+        self.assertTrue((self.dirs[2] / "a.jpg").exists())
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.optimize_images.make_executor("fibers", 1)
+
+
+class OptimizeExecutorDefaultTests(SimpleTestCase):
+    def test_threads_unless_processes_are_asked_for(self):
+        optimize_images = import_script("optimize_images")
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        dirs = [root / name for name in ("in", "out", "originals")]
+        for path in dirs:
+            path.mkdir()
+        spy = mock.patch.object(
+            optimize_images, "make_executor", wraps=optimize_images.make_executor
+        )
+        with spy as make_executor:
+            optimize_images.process_images(*dirs, workers=1)
+        make_executor.assert_called_once_with("thread", 1)
+
+
+class OptimizeCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.optimize_images = import_script("optimize_images")
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(mock.patch.object(self.optimize_images, "STATIC_DIR", root))
+        self.input_dir, self.output_dir, self.original_dir = (
+            root / name for name in ("in", "out", "originals")
+        )
+        for path in (self.input_dir, self.output_dir, self.original_dir):
+            path.mkdir()
+        self.manifest = root / "manifest.json"
+        Image.new("RGB", (64, 48), "green").save(self.input_dir / "fig.jpg")
+        self.optimize()
+
+    def optimize(self):
+        """Process the inputs, returning the files optimize_image() was given."""
+        spy = mock.patch.object(
+            self.optimize_images,
+            "optimize_image",
+            wraps=self.optimize_images.optimize_image,
+        )
+        with spy as optimize_image:
+            done, failed, _ = self.optimize_images.process_images(
+                self.input_dir,
+                self.output_dir,
+                self.original_dir,
+                mode="thread",
+                workers=1,
+                manifest_path=self.manifest,
+            )
+        self.assertEqual((done, failed), (1, 0))
+        self.assertIn("out/fig.jpg", json.loads(self.manifest.read_text()))
+        return optimize_image.call_args_list
+
+    def put_back(self):
+        shutil.copy(self.original_dir / "fig.jpg", self.input_dir / "fig.jpg")
+
+    def test_unchanged_input_is_skipped(self):
+        self.put_back()
+        with self.assertLogs("optimize_images", "INFO") as logs:
+            calls = self.optimize()
+        self.assertEqual(calls, [])
+        self.assertIn("Unchanged, skipping", "\n".join(logs.output))
+        self.assertTrue((self.original_dir / "fig.jpg").exists())
+
+    def test_missing_output_is_rebuilt(self):
+        (self.output_dir / "fig.webp").unlink()
+        self.put_back()
+        calls = self.optimize()
+        self.assertEqual(len(calls), 1)
+        self.assertNotIn("webp", calls[0].kwargs["fresh"])
+        self.assertIn("jpg", calls[0].kwargs["fresh"])
+        self.assertTrue((self.output_dir / "fig.webp").exists())
+
+    def test_changed_input_is_processed(self):
+        Image.new("RGB", (64, 48), "red").save(self.input_dir / "fig.jpg")
+        self.assertEqual(len(self.optimize()), 1)
+
+
+class DraftDecodeTests(SimpleTestCase):
+    def setUp(self):
+        self.optimize_images = import_script("optimize_images")
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.photo = self.tmp / "photo.jpg"
+        Image.new("RGB", (4000, 3000), "green").save(self.photo)
+
+    def test_jpeg_decodes_at_draft_scale(self):
+        with self.optimize_images.open_image(self.photo, (1200, 1200)) as img:
+            self.assertEqual(img.size, (2000, 1500))
+            img.load()
+            self.assertEqual(img.size, (2000, 1500))
+
+    def test_small_box_picks_smaller_scale(self):
+        with self.optimize_images.open_image(self.photo, (400, 400)) as img:
+            self.assertEqual(img.size, (500, 375))
+
+    def test_probe(self):
+        self.assertEqual(self.optimize_images.probe(self.photo), 2000 * 1500 * 3)
+        notes = self.tmp / "notes.txt"
+        notes.write_text("not an image")
+        self.assertIsNone(self.optimize_images.probe(notes))
+
+
+class ImageResizeTests(SimpleTestCase):
+    def setUp(self):
+        self.source_dir = Path(tempfile.mkdtemp())
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.source_dir)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        (self.source_dir / "trees").mkdir()
+        self.fig = self.source_dir / "trees/fig.jpg"
+        Image.new("RGB", (800, 600), "green").save(self.fig)
+        (self.source_dir.parent / "secret.jpg").write_bytes(b"not for you")
+        self.addCleanup((self.source_dir.parent / "secret.jpg").unlink)
+        self.enterContext(
+            override_settings(
+                IMAGE_RESIZE_SOURCE_DIR=str(self.source_dir),
+                IMAGE_RESIZE_CACHE_DIR=str(self.cache_dir),
+                IMAGE_RESIZE_WIDTHS=[160, 320, 640],
+            )
+        )
+
+    def versioned(self, url):
+        """Follow the uncached redirect from an unversioned /img/ URL."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        return response["Location"]
+
+    def image_size(self, response):
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as img:
+            return img.size
+
+    def test_versioned_ladder_width_is_resized(self):
+        url = self.versioned("/img/320/trees/fig.jpg")
+        self.assertRegex(url, r"^/img/320/[0-9a-f]{12}/trees/fig\.jpg$")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.image_size(response), (320, 240))
+
+    def test_other_widths_redirect_to_ladder(self):
+        url = self.versioned("/img/200/trees/fig.jpg")
+        self.assertTrue(url.startswith("/img/320/"))
+        self.assertTrue(
+            self.versioned("/img/5000/trees/fig.jpg").startswith("/img/640/")
+        )
+        response = self.client.get(url.replace("/320/", "/200/"))
+        self.assertRedirects(
+            response, url, status_code=301, fetch_redirect_response=False
+        )
+
+    def test_changed_source_gets_new_version(self):
+        old_url = self.versioned("/img/320/trees/fig.jpg")
+        Image.new("RGB", (400, 300), "red").save(self.fig)
+        new_url = self.versioned("/img/320/trees/fig.jpg")
+        self.assertNotEqual(new_url, old_url)
+        response = self.client.get(old_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], new_url)
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_exif_orientation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # stored turned: displayed 600 wide, 800 high
+        Image.new("RGB", (800, 600), "green").save(self.fig, exif=exif)
+        response = self.client.get(self.versioned("/img/320/trees/fig.jpg"))
+        self.assertEqual(self.image_size(response), (320, 427))
+
+    def test_path_traversal_is_404(self):
+        for path in ("../secret.jpg", "trees/../../secret.jpg", "%2e%2e/secret.jpg"):
+            with self.subTest(path=path):
+                response = self.client.get(f"/img/320/{path}")
+                self.assertEqual(response.status_code, 404)
+
+    def test_unknown_or_unsupported_file_is_404(self):
+        (self.source_dir / "notes.txt").write_text("hello")
+        for path in (
+            "trees/missing.jpg",
+            "notes.txt",
+            "0123456789ab/trees/missing.jpg",
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(f"/img/320/{path}")
+                self.assertEqual(response.status_code, 404)
+        self.assertEqual(list(self.cache_dir.glob("*.jpg")), [])
+
+
+class PlaceholderTests(SimpleTestCase):
+    def test_placeholder_and_dominant_colour(self):
+        optimize_images = import_script("optimize_images")
+        img = Image.new("RGB", (400, 300), (200, 0, 0))
+        img.paste((0, 0, 200), (0, 0, 100, 100))
+
+        result = optimize_images.placeholder(img)
+
+        self.assertEqual(result["color"], "#c80000")
+        prefix = "data:image/webp;base64,"
+        self.assertTrue(result["placeholder"].startswith(prefix))
+        data = base64.b64decode(result["placeholder"].removeprefix(prefix))
+        self.assertLess(len(data), 400)
+        with Image.open(io.BytesIO(data)) as tiny:
+            self.assertEqual(tiny.size, (16, 12))
+
+
+PLACEHOLDER = "data:image/webp;base64,AAAA"
+
+
+class PlaceholderMarkupTests(SimpleTestCase):
+    manifest = {
+        "images/trees/fig.jpg": {
+            "width": 640,
+            "height": 480,
+            "sources": FIG_SOURCES,
+            "placeholder": PLACEHOLDER,
+            "color": "#335522",
+        },
+        "images/trees/lemon.jpg": {"width": 300, "height": 400, "color": "#aabb00"},
+    }
+
+    def setUp(self):
+        self.enterContext(
+            mock.patch(
+                "main.responsive_images.load_manifest", return_value=self.manifest
+            )
+        )
+
+    def render(self, tag):
+        return Template("{% load responsive_images %}" + tag).render(Context())
+
+    def test_picture_has_placeholder_background(self):
+        html = self.render('{% responsive_image "images/trees/fig.jpg" "Fig" %}')
+        self.assertIn(
+            f'style="background: #335522 url({PLACEHOLDER}) center / cover no-repeat"',
+            html,
+        )
+
+    def test_entry_without_sources_is_sized_img(self):
+        html = self.render('{% responsive_image "images/trees/lemon.jpg" "Lemon" %}')
+        self.assertInHTML(
+            '<img src="/static/images/trees/lemon.jpg" alt="Lemon" width="300"'
+            ' height="400" loading="lazy" decoding="async"'
+            ' style="background-color: #aabb00">',
+            html,
+        )
+
+    def test_image_placeholder_tag(self):
+        html = self.render('<img{% image_placeholder "images/trees/fig.jpg" %}>')
+        self.assertInHTML(
+            '<img width="640" height="480" style="height: auto; background: #335522'
+            f' url({PLACEHOLDER}) center / cover no-repeat">',
+            html,
+        )
+        self.assertEqual(self.render('{% image_placeholder "images/other.jpg" %}'), "")
+
+
+class PlaceholderStyleTests(SimpleTestCase):
+    def test_placeholder_without_colour_is_transparent(self):
+        self.assertEqual(
+            placeholder_style({"placeholder": PLACEHOLDER}),
+            f"background: transparent url({PLACEHOLDER}) center / cover no-repeat",
+        )
+
+    def test_no_placeholder_or_colour(self):
+        self.assertIsNone(placeholder_style({"width": 1, "height": 1}))
+
+
+class FilenameDateTests(SimpleTestCase):
+    def test_year_first_dates(self):
+        self.assertEqual(filename_date("fig-24-6-28"), (date(2024, 6, 28), True))
+        self.assertEqual(filename_date("fig-2024-6-28"), (date(2024, 6, 28), True))
+        self.assertEqual(filename_date("fig-2024-7"), (date(2024, 7, 1), False))
+
+    def test_no_date(self):
+        self.assertEqual(filename_date("fig"), (None, False))
+
+    def test_month_first_and_impossible_dates_are_ignored(self):
+        future = f"fig-{date.today().year + 1}-1-1"
+        for stem in (
+            "fig-7-12-24",
+            "fig-24-13-1",
+            "fig-24-2-30",
+            "fig-2019-6-1",
+            future,
+        ):
+            with self.subTest(stem=stem), self.assertLogs(
+                "main.tree_photos", "WARNING"
+            ):
+                self.assertEqual(filename_date(stem), (None, False))
+
+
+class GrowthLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plant = Plant.objects.create(name="Fig Tree", slug="fig", kind="tree")
+        start = date(2024, 1, 1)
+        # Three entries per date so pages split runs of equal dates.
+        Observation.objects.bulk_create(
+            Observation(plant=cls.plant, observed_on=start + timedelta(days=i // 3))
+            for i in range(25)
+        )
+
+    def setUp(self):
+        caches["template_fragments"].clear()
+
+    def test_keyset_pages_have_no_repeats_or_gaps(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = observation_page(self.plant, cursor, page_size=4)
+            seen.extend(page)
+            if cursor is None:
+                break
+        expected = list(self.plant.observations.order_by("-observed_on", "-id"))
+        self.assertEqual([o.pk for o in seen], [o.pk for o in expected])
+
+    def test_page_view_follows_cursor(self):
+        with self.settings(GROWTH_LOG_PAGE_SIZE=10):
+            first = self.client.get("/growing/log/fig/")
+            cursor = first.context["next_cursor"]
+            second = self.client.get("/growing/log/fig/", {"before": cursor})
+        pks = [o.pk for o in first.context["observations"]]
+        pks += [o.pk for o in second.context["observations"]]
+        self.assertEqual(len(pks), 20)
+        self.assertEqual(len(set(pks)), 20)
+
+    def test_bad_cursor_is_404(self):
+        response = self.client.get("/growing/log/fig/", {"before": "yesterday"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_photo_changes_refresh_cached_entry(self):
+        observation = self.plant.observations.first()
+        self.client.get("/growing/log/fig/")
+        photo = Photo.objects.create(
+            observation=observation,
+            image="images/trees/fig-24-7-28.jpg",
+            caption="First figs",
+        )
+        self.assertContains(self.client.get("/growing/log/fig/"), "First figs")
+
+        photo.delete()
+        self.assertNotContains(self.client.get("/growing/log/fig/"), "First figs")
+
+    def test_bulk_photo_delete_refreshes_cached_entry(self):
+        observation = self.plant.observations.first()
+        Photo.objects.create(
+            observation=observation,
+            image="images/trees/fig-24-7-28.jpg",
+            caption="First figs",
+        )
+        self.assertContains(self.client.get("/growing/log/fig/"), "First figs")
+
+        Photo.objects.filter(observation=observation).delete()
+        self.assertNotContains(self.client.get("/growing/log/fig/"), "First figs")
+
+    def test_plant_rename_refreshes_cached_entries(self):
+        observation = self.plant.observations.first()
+        Photo.objects.create(
+            observation=observation, image="images/trees/fig-24-7-28.jpg"
+        )
+        self.assertContains(self.client.get("/growing/log/fig/"), 'alt="Fig Tree"')
+
+        self.plant.name = "Brown Turkey Fig"
+        self.plant.save()
+        response = self.client.get("/growing/log/fig/")
+        self.assertContains(response, 'alt="Brown Turkey Fig"')
+        self.assertNotContains(response, 'alt="Fig Tree"')
+
+    def test_warm_page_skips_photo_query(self):
+        observation = self.plant.observations.first()
+        Photo.objects.create(
+            observation=observation, image="images/trees/fig-24-7-28.jpg"
+        )
+        self.client.get("/growing/log/fig/")
+        # The plant and the page of observations; photos come from the
+        # cached fragments.
+        with self.assertNumQueries(2):
+            self.client.get("/growing/log/fig/")
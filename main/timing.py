@@ -0,0 +1,139 @@
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from prometheus_client import (
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels).
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASES = ("total", "middleware", "url", "view", "db", "template")
+METRIC_NAME = "django_request_phase_seconds"
+
+current_timings = ContextVar("current_timings", default=None)
+
+
+class RequestTimings:
+    """Phase timings for one request, filled in by the middleware pair."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.inner_started = self.view_started = self.inner_finished = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.phases["db"] += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        """Derive the phase durations once the response is back."""
+        finished = time.perf_counter()
+        self.phases["total"] = finished - self.started
+        if self.inner_started is None:
+            # A middleware answered before URL resolution (e.g. a redirect).
+            self.phases["middleware"] = self.phases["total"]
+            return
+        inner = self.inner_finished - self.inner_started
+        self.phases["middleware"] = self.phases["total"] - inner
+        if self.view_started is None:
+            self.phases["url"] = inner
+        else:
+            self.phases["url"] = self.view_started - self.inner_started
+            self.phases["view"] = self.inner_finished - self.view_started
+
+    def header(self):
+        """Server-Timing header value, durations in milliseconds."""
+        parts = []
+        for phase in PHASES:
+            entry = f"{phase};dur={self.phases[phase] * 1000:.2f}"
+            if phase == "db":
+                entry += f';desc="{self.queries} queries"'
+            parts.append(entry)
+        return ", ".join(parts)
+
+
+class PhaseHistograms:
+    """Per-route, per-phase latency histograms shared by all gunicorn workers.
+
+    With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it), each worker
+    records into its own files there and a scrape of /metrics/, whichever
+    worker it reaches, adds up every worker's files, those of exited workers
+    included. The counters therefore only ever grow until gunicorn restarts.
+    Without it (runserver, tests) the histograms are this process's own.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.registry = CollectorRegistry()
+        self.histogram = Histogram(
+            METRIC_NAME,
+            "Time spent per request phase, by route.",
+            ["route", "phase"],
+            buckets=buckets,
+            registry=self.registry,
+        )
+
+    def observe(self, route, timings):
+        for phase, seconds in timings.phases.items():
+            self.histogram.labels(route, phase).observe(seconds)
+
+    def exposition(self):
+        """The histograms in the Prometheus text format."""
+        if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+            return generate_latest(self.registry)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+
+histograms = PhaseHistograms()
+
+
+def has_metrics_token(request):
+    """True if the request carries METRICS_TOKEN as a bearer token."""
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    if not token or not header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(header.removeprefix("Bearer "), token)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.phases["template"] += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding render time to the request timings.
+
+    Only top-level renders are timed; {% include %} and {% extends %} happen
+    inside them, so nothing is counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
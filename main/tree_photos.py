@@ -0,0 +1,149 @@
+import json
+import logging
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# First word of a photo's filename -> tree slug used by the views
+TREE_PREFIXES = {
+    "avocado": "avocado",
+    "fig": "fig",
+    "lemon": "meyer-lemon",
+    "meyer": "meyer-lemon",
+    "pom": "pomegranate",
+    "pomegranate": "pomegranate",
+}
+# Trailing year-first date in a filename: "24-6-28", "2024-6-28" or "2024-7"
+FILENAME_DATE = re.compile(r"(\d{4}|\d{2})-(\d{1,2})(?:-(\d{1,2}))?$")
+# Filename dates before this year are misreadings (e.g. a month-first "7-12-24")
+MIN_YEAR = 2020
+# -<width>w variants written by optimize_images.py
+VARIANT = re.compile(r"-\d+w$")
+EXIF_IFD = 0x8769
+DATE_TIME_ORIGINAL = 36867
+DATE_TIME = 306
+CAPTIONS_FILE = "captions.json"
+
+_index = None
+
+
+def exif_date(img):
+    """Capture date from EXIF DateTimeOriginal (or DateTime), or None."""
+    exif = img.getexif()
+    value = exif.get_ifd(EXIF_IFD).get(DATE_TIME_ORIGINAL) or exif.get(DATE_TIME)
+    try:
+        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filename_date(stem):
+    """(date, day known) from the end of a filename, or (None, False).
+
+    Dates are year first: "24-6-28", "2024-6-28" or "2024-7". Anything that
+    doesn't read as a real date from MIN_YEAR up to today, such as a
+    month-first "7-12-24", is logged and ignored rather than misdated.
+    """
+    match = FILENAME_DATE.search(stem)
+    if match is None:
+        return None, False
+    year, month, day = (int(g) if g else None for g in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        taken = date(year, month, day or 1)
+    except ValueError:
+        taken = None
+    if taken is None or not date(MIN_YEAR, 1, 1) <= taken <= date.today():
+        logger.warning(
+            f"Ignoring {match.group(0)!r} in {stem!r}: not a year-first date"
+        )
+        return None, False
+    return taken, day is not None
+
+
+def tree_for(stem):
+    return TREE_PREFIXES.get(re.split(r"[-_ ]", stem.lower(), maxsplit=1)[0])
+
+
+def photo_entry(path, captions, static_root):
+    """Timeline entry for one photo, or None if it isn't a dated tree photo."""
+    tree = tree_for(path.stem)
+    if tree is None or VARIANT.search(path.stem):
+        return None
+    with Image.open(path) as img:
+        taken, day_known = exif_date(img), True
+    if taken is None:
+        taken, day_known = filename_date(path.stem)
+    if taken is None:
+        return None
+    static_path = path.resolve().relative_to(static_root).as_posix()
+    return {
+        "tree": tree,
+        "date": taken.isoformat(),
+        "label": (
+            f"{taken:%B} {taken.day}, {taken.year}" if day_known else f"{taken:%B %Y}"
+        ),
+        "jpg": static_path,
+        "caption": captions.get(path.name, ""),
+    }
+
+
+def load_captions(root):
+    """{filename: caption} from captions.json; {} (logged) if it's unreadable."""
+    try:
+        return json.loads((root / CAPTIONS_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.error(f"Ignoring {root / CAPTIONS_FILE}: {exc}")
+        return {}
+
+
+def build_photo_index(root=None):
+    """{tree slug: [photo, ...] oldest first} from the .jpg files under root.
+
+    Each photo's date is its EXIF capture date, else the date in its
+    filename; undated images (the index cards' cover photos) are left out.
+    Captions come from captions.json in the same directory, by filename.
+    Runs in MainConfig.ready(), so problems are logged, never raised: a bad
+    photo, caption file or TREE_PHOTOS_DIR must not stop manage.py.
+    """
+    root = Path(root or settings.TREE_PHOTOS_DIR)
+    static_root = Path(settings.STATICFILES_DIRS[0]).resolve()
+    if not root.resolve().is_relative_to(static_root):
+        logger.error(f"TREE_PHOTOS_DIR {root} is not under {static_root}")
+        return {}
+    captions = load_captions(root)
+    index = {}
+    for path in sorted(root.glob("*.jpg")):
+        try:
+            entry = photo_entry(path, captions, static_root)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Skipping {path}: {exc}")
+            continue
+        if entry is not None:
+            index.setdefault(entry.pop("tree"), []).append(entry)
+    for photos in index.values():
+        photos.sort(key=lambda photo: (photo["date"], photo["jpg"]))
+    return index
+
+
+def load_photo_index():
+    """Build the index once per process; MainConfig.ready() calls this."""
+    global _index
+    _index = build_photo_index()
+    return _index
+
+
+def tree_photos(tree, title):
+    """The timeline for a tree, with alt text naming the tree and the date."""
+    index = _index if _index is not None else load_photo_index()
+    return [
+        {**photo, "alt": f"{title} - {photo['label']}"} for photo in index.get(tree, [])
+    ]
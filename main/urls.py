@@ -1,7 +1,10 @@
 from django.contrib.auth.views import LogoutView
-from django.urls import include, path
+from django.urls import include, path, register_converter
 
 from . import views
+from .image_resize import VersionConverter
+
+register_converter(VersionConverter, "image_version")
 
 urlpatterns = [
     path("", views.homepage, name="homepage"),
@@ -44,6 +47,26 @@ urlpatterns = [
     path("learning/pgp_aiml/project4", views.project4, name="project4"),
     path("learning/pgp_aiml/project5", views.project5, name="project5"),
     path("learning/pgp_aiml/project6", views.project6, name="project6"),
+    path(
+        "learning/pgp_aiml/assets/<str:name>",
+        views.prebuilt_asset,
+        name="prebuilt_asset",
+    ),
+    path(
+        "learning/pgp_aiml/cells/<str:name>",
+        views.notebook_cells,
+        name="notebook_cells",
+    ),
+    path(
+        "img/<int:width>/<image_version:version>/<path:path>",
+        views.resized_image,
+        name="resized_image",
+    ),
+    path(
+        "img/<int:width>/<path:path>",
+        views.resized_image,
+        name="resized_image_latest",
+    ),
     path("technology/", views.technology_view, name="technology"),
     path("technology/cloud/", views.cloud_technologies_view, name="cloud_technologies"),
     path("technology/devops-cicd/", views.devops_cicd_view, name="devops_cicd"),
@@ -75,6 +98,9 @@ urlpatterns = [
         views.pomegranate_tree,
         name="growing_trees_pomegranate",
     ),
+    path("growing/log/", views.growth_log, name="growth_log"),
+    path("growing/log/<slug:slug>/", views.plant_log, name="plant_log"),
+    path("metrics/", views.metrics, name="metrics"),
     path("about/", views.about, name="about"),
     path("about/why/", views.about_why, name="about_why"),
     path("accounts/", include("django.contrib.auth.urls")),
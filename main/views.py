@@ -9,130 +9,163 @@ from django.contrib.auth.views import (
     PasswordResetDoneView,
     PasswordResetView,
 )
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import redirect, render
+from django.views.decorators.cache import never_cache
 from django.views.generic import TemplateView
 
 from .forms import CustomUserCreationForm
+from .growth_log import plant_log_context, plants
+from .image_resize import serve_resized
+from .page_cache import render_cached
+from .prebuilt import render_prebuilt, serve_asset, serve_cells
+from .timing import has_metrics_token, histograms
+from .tree_photos import tree_photos
 
 logger = logging.getLogger(__name__)
 
 
 def homepage(request):
-    return render(request, "index.html")
+    return render_cached(request, "index.html")
 
 
 def about(request):
-    return render(request, "about/index.html")
+    return render_cached(request, "about/index.html")
 
 
 def about_why(request):
-    return render(request, "about/why.html")
+    return render_cached(request, "about/why.html")
 
 
 def learning(request):
-    return render(request, "learning/index.html")
+    return render_cached(request, "learning/index.html")
 
 
 def full_stack(request):
-    return render(request, "learning/full_stack/index.html")
+    return render_cached(request, "learning/full_stack/index.html")
 
 
 def cloud_tech(request):
-    return render(request, "learning/full_stack/cloud_tech.html")
+    return render_cached(request, "learning/full_stack/cloud_tech.html")
 
 
 def devops_overview(request):
-    return render(request, "learning/full_stack/devops_overview.html")
+    return render_cached(request, "learning/full_stack/devops_overview.html")
 
 
 def django_details(request):
-    return render(request, "learning/full_stack/django_details.html")
+    return render_cached(request, "learning/full_stack/django_details.html")
 
 
 def frontend_overview(request):
-    return render(request, "learning/full_stack/frontend_overview.html")
+    return render_cached(request, "learning/full_stack/frontend_overview.html")
 
 
 def pgp_aiml(request):
-    return render(request, "learning/pgp_aiml/index.html")
+    return render_cached(request, "learning/pgp_aiml/index.html")
 
 
 def ai_foundations(request):
-    return render(request, "learning/pgp_aiml/ai_foundations.html")
+    return render_cached(request, "learning/pgp_aiml/ai_foundations.html")
 
 
 def machine_learning(request):
-    return render(request, "learning/pgp_aiml/machine_learning.html")
+    return render_cached(request, "learning/pgp_aiml/machine_learning.html")
 
 
 def deep_learning(request):
-    return render(request, "learning/pgp_aiml/deep_learning.html")
+    return render_cached(request, "learning/pgp_aiml/deep_learning.html")
 
 
 def course_projects(request):
-    return render(request, "learning/pgp_aiml/course_projects.html")
+    return render_cached(request, "learning/pgp_aiml/course_projects.html")
 
 
 def project1(request):
-    return render(request, "learning/pgp_aiml/project1.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project1.html")
 
 
 def project2(request):
-    return render(request, "learning/pgp_aiml/project2.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project2.html")
 
 
 def project3(request):
-    return render(request, "learning/pgp_aiml/project3.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project3.html")
 
 
 def project4(request):
-    return render(request, "learning/pgp_aiml/project4.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project4.html")
 
 
 def project5(request):
-    return render(request, "learning/pgp_aiml/project5.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project5.html")
 
 
 def project6(request):
-    return render(request, "learning/pgp_aiml/project6.html")
+    return render_prebuilt(request, "learning/pgp_aiml/project6.html")
+
+
+def prebuilt_asset(request, name):
+    return serve_asset(request, name)
+
+
+def notebook_cells(request, name):
+    return serve_cells(request, name)
+
+
+def resized_image(request, width, path, version=None):
+    return serve_resized(request, width, path, version)
+
+
+@never_cache
+def metrics(request):
+    """Per-route request phase histograms across all workers, for Prometheus."""
+    if not (request.user.is_staff or has_metrics_token(request)):
+        raise PermissionDenied
+    return HttpResponse(
+        histograms.exposition(), content_type="text/plain; version=0.0.4"
+    )
 
 
 def technology_view(request):
-    return render(request, "technology/index.html")
+    return render_cached(request, "technology/index.html")
 
 
 def cloud_technologies_view(request):
-    return render(request, "technology/cloud_technologies.html")
+    return render_cached(request, "technology/cloud_technologies.html")
 
 
 def devops_cicd_view(request):
-    return render(request, "technology/devops_cicd.html")
+    return render_cached(request, "technology/devops_cicd.html")
 
 
 def backend_technologies_view(request):
-    return render(request, "technology/backend_technologies.html")
+    return render_cached(request, "technology/backend_technologies.html")
 
 
 def frontend_technologies_view(request):
-    return render(request, "technology/frontend_technologies.html")
+    return render_cached(request, "technology/frontend_technologies.html")
 
 
 def growing(request):
-    return render(request, "growing/index.html")
+    return render_cached(request, "growing/index.html")
 
 
 def succulents(request):
-    return render(request, "growing/succulents/index.html")
+    return render_cached(request, "growing/succulents/index.html")
 
 
-def tree_page(request, title, template_name):
+def tree_page(request, title, template_name, tree=None):
+    """A tree's page; with ``tree``, its photo timeline from main/tree_photos.py."""
     description = f"This page documents the growth of the {title} with periodic updates and photos."
-    return render(
+    return render_cached(
         request,
         template_name,
         {
             "title": title,
             "description": description,
+            "photos": tree_photos(tree, title) if tree else [],
         },
     )
 
@@ -142,23 +175,37 @@ def trees_index(request):
 
 
 def meyer_lemon_tree(request):
-    return tree_page(request, "Meyer Lemon Tree", "growing/trees/meyer_lemon.html")
+    return tree_page(
+        request, "Meyer Lemon Tree", "growing/trees/meyer_lemon.html", "meyer-lemon"
+    )
 
 
 def avocado_tree(request):
-    return tree_page(request, "Avocado Tree", "growing/trees/avocado.html")
+    return tree_page(request, "Avocado Tree", "growing/trees/avocado.html", "avocado")
 
 
 def fig_tree(request):
-    return tree_page(request, "Fig Tree", "growing/trees/fig.html")
+    return tree_page(request, "Fig Tree", "growing/trees/fig.html", "fig")
 
 
 def pomegranate_tree(request):
     return tree_page(
-        request, "Pomegranate Shrub (Tree)", "growing/trees/pomegranate.html"
+        request,
+        "Pomegranate Shrub (Tree)",
+        "growing/trees/pomegranate.html",
+        "pomegranate",
     )
 
 
+def growth_log(request):
+    return render(request, "growing/log/index.html", {"plants": plants()})
+
+
+def plant_log(request, slug):
+    context = plant_log_context(slug, request.GET.get("before"))
+    return render(request, "growing/log/plant.html", context)
+
+
 def signup(request):
     if request.method == "POST":
         form = CustomUserCreationForm(request.POST)
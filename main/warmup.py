@@ -0,0 +1,51 @@
+import logging
+import time
+from pathlib import Path
+
+from django.template import engines
+from django.template.loader import get_template
+
+from .page_cache import template_fingerprint
+from .prebuilt import prebuilt_entry
+
+logger = logging.getLogger(__name__)
+
+
+def template_names():
+    """Every template under the project's template DIRS, as loader names."""
+    names = []
+    for directory in engines["django"].engine.dirs:
+        root = Path(directory)
+        names.extend(
+            path.relative_to(root).as_posix()
+            for path in sorted(root.rglob("*"))
+            if path.is_file()
+        )
+    return names
+
+
+def warm_templates(names=None):
+    """Compile templates into the cached loader ahead of the first request.
+
+    Pages with an up-to-date prebuilt copy are skipped: they never reach the
+    template engine, and compiling them would only cost each worker memory.
+    A template that fails for any reason is logged and skipped; warm-up
+    runs while a worker boots, and must never stop it from serving.
+    Returns (name, seconds, status) for each template.
+    """
+    results = []
+    for name in names or template_names():
+        started = time.perf_counter()
+        try:
+            if prebuilt_entry(name) is not None:
+                status = "prebuilt"
+            else:
+                get_template(name)
+                status = "compiled"
+            # Also primes the file hashes used for cache keys and ETags.
+            template_fingerprint(name)
+        except Exception as e:
+            logger.warning(f"Template warm-up failed for {name}: {e!r}")
+            status = f"error: {e!r}"
+        results.append((name, time.perf_counter() - started, status))
+    return results